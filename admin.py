@@ -1,15 +1,14 @@
 import streamlit as st
-import sqlite3
-from datetime import datetime
-import hashlib
-from PIL import Image
-import pandas as pd
-import base64
-import altair as alt
-import google.generativeai as genai
+import os
+import time
+from datetime import date, timedelta
+from lifelink import assets, cache, export, importer, insights, ledger, migrations, perf, repository as repo, slots, writer
+from lifelink.db import pool_stats
+from lifelink.ui import DONOR_HEADERS, paginated_donor_table, paginated_table
 
 # ------------------ Configuration ------------------
 st.set_page_config(page_title="LifeLink Blood Bank", layout="wide")
+perf.begin("admin")
 
 # ------------------ Session State ------------------
 for key, default in {
@@ -22,142 +21,55 @@ for key, default in {
         st.session_state[key] = default
 
 # ------------------ Database Functions ------------------
-def connect_db():
-    return sqlite3.connect("lifelink.db")
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def init_db():
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Users (
-                        UserID INTEGER PRIMARY KEY AUTOINCREMENT,
-                        Username TEXT UNIQUE,
-                        Password TEXT,
-                        FullName TEXT,
-                        Age INTEGER,
-                        Gender TEXT,
-                        Contact TEXT)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Donors (
-                        DonorID INTEGER PRIMARY KEY AUTOINCREMENT,
-                        Name TEXT,
-                        Age INTEGER,
-                        Gender TEXT,
-                        BloodGroup TEXT,
-                        Contact TEXT)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Stock (
-                        BloodGroup TEXT PRIMARY KEY,
-                        Units INTEGER DEFAULT 0)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS Transactions (
-                        TransactionID INTEGER PRIMARY KEY AUTOINCREMENT,
-                        DonorID INTEGER,
-                        BloodGroup TEXT,
-                        Units INTEGER,
-                        Type TEXT,
-                        Date TEXT)''')
-    cursor.execute("SELECT COUNT(*) FROM Stock")
-    if cursor.fetchone()[0] == 0:
-        for group in ['A+','A-','B+','B-','O+','O-','AB+','AB-']:
-            cursor.execute("INSERT INTO Stock (BloodGroup, Units) VALUES (?, ?)", (group, 0))
-    db.commit()
-    db.close()
-
-init_db()
+migrations.ensure_schema()
 
 # ------------------ Gemini AI Setup ------------------
-try:
-    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-    gemini_model = genai.GenerativeModel("gemini-pro")
-except Exception as e:
-    gemini_model = None
-    st.warning("⚠️ Gemini AI not configured. Admin AI features will be disabled.")
+def get_ai_backend():
+    # Configured on the first AI Insights visit, then shared by every session.
+    # LIFELINK_AI_BACKEND=stub swaps in the deterministic offline backend (tests, benchmarks).
+    if os.environ.get("LIFELINK_AI_BACKEND") == "stub":
+        return insights.get_backend("stub")
+    try:
+        return insights.get_backend("gemini", st.secrets["GEMINI_API_KEY"])
+    except Exception:
+        return None
 
 # ------------------ Auth & User Functions ------------------
 def signup(username, password, full_name, age, gender, contact):
-    db = connect_db()
-    cursor = db.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO Users (Username, Password, FullName, Age, Gender, Contact) VALUES (?, ?, ?, ?, ?, ?)",
-            (username, hash_password(password), full_name, age, gender, contact)
-        )
-        db.commit()
+    if repo.create_user(username, password, full_name, age, gender, contact):
         st.success("✅ Signup successful!")
-    except sqlite3.IntegrityError:
+    else:
         st.error("❌ Username already exists.")
-    db.close()
-
-def login(username, password):
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Users WHERE Username=? AND Password=?", (username, hash_password(password)))
-    user = cursor.fetchone()
-    db.close()
-    return user
-
-def get_user_profile(username):
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT FullName, Age, Gender, Contact FROM Users WHERE Username=?", (username,))
-    profile = cursor.fetchone()
-    db.close()
-    return profile
+
+login = repo.login
+get_user_profile = repo.get_user_profile
 
 # ------------------ Donor and Stock Management ------------------
 def add_donor(name, age, gender, blood_group, contact):
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact) VALUES (?, ?, ?, ?, ?)",
-                   (name, age, gender, blood_group.upper(), contact))
-    db.commit()
-    db.close()
+    from lifelink import dedup
+    donor_id = repo.add_donor(name, age, gender, blood_group, contact)
     st.success("✅ Donor added successfully!")
+    matches = dedup.candidates_for(donor_id)
+    if matches:
+        st.warning("⚠️ Possible duplicate of donor "
+                   + ", ".join(f"#{other} ({score:.0%} match)" for other, score in matches)
+                   + ". Review it under Duplicates.")
+
+search_donor = repo.search_donor
+get_donor = repo.get_donor
 
-def search_donor(blood_group):
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT DonorID, Name, Age, Gender, Contact FROM Donors WHERE BloodGroup=?", (blood_group.upper(),))
-    donors = cursor.fetchall()
-    db.close()
-    return donors
-
-def view_all_donors():
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT DonorID, Name, Age, Gender, BloodGroup, Contact FROM Donors")
-    donors = cursor.fetchall()
-    db.close()
-    return donors
-
-def update_stock(blood_group, units, t_type, donor_id=None):
-    db = connect_db()
-    cursor = db.cursor()
-    if t_type == "Donation":
-        cursor.execute("UPDATE Stock SET Units = Units + ? WHERE BloodGroup=?", (units, blood_group.upper()))
-    elif t_type == "Issue":
-        cursor.execute("SELECT Units FROM Stock WHERE BloodGroup=?", (blood_group.upper(),))
-        result = cursor.fetchone()
-        if not result or result[0] < units:
-            st.error("❌ Not enough stock!")
-            db.close()
-            return
-        cursor.execute("UPDATE Stock SET Units = Units - ? WHERE BloodGroup=?", (units, blood_group.upper()))
-    cursor.execute("INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date) VALUES (?, ?, ?, ?, ?)",
-                   (donor_id, blood_group.upper(), units, t_type, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-    db.commit()
-    db.close()
+def update_stock(blood_group, units, t_type, donor_id=None, component="Whole Blood", center=slots.HOME_CENTER):
+    try:
+        repo.update_stock(blood_group, units, t_type, donor_id, component, center)
+    except repo.InsufficientStock:
+        st.error("❌ Not enough stock!")
+        return
     st.success(f"✅ {t_type} recorded successfully!")
 
-def view_stock():
-    db = connect_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Stock")
-    stock = cursor.fetchall()
-    db.close()
-    return stock
+view_stock = repo.view_stock
 
 # ------------------ UI Helpers ------------------
+@perf.timed("to_html")
 def render_centered_table(df):
     st.markdown(
         df.to_html(index=False, classes="table table-striped table-bordered", justify='center'),
@@ -170,22 +82,23 @@ def render_centered_table(df):
         </style>
     """, unsafe_allow_html=True)
 
-def image_to_base64(img_path):
-    with open(img_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+DONOR_SEARCH_HEADERS = DONOR_HEADERS + ["Last Donation"]
+
+def with_last_donation(page):
+    """A search page with LastDonation shown as "Never" for donors who have not given yet."""
+    rows, cursor = page
+    return [row[:6] + (row[6] or "Never",) for row in rows], cursor
 
 def display_main_logo():
     try:
-        logo = Image.open("assets/logo.jpeg")
-        st.image(logo, width=300)
+        st.image(assets.logo(assets.MAIN_LOGO_WIDTH).data, width=assets.MAIN_LOGO_WIDTH)
     except:
         st.warning("⚠️ Logo not found.")
 
 def display_small_logo():
     try:
-        b64 = image_to_base64("assets/logo.jpeg")
         st.markdown(
-            f"<img src='data:image/png;base64,{b64}' style='position:fixed; top:80px; right:10px; width:60px; z-index:100;'>",
+            assets.logo_tag(assets.SMALL_LOGO_WIDTH, "position:fixed; top:80px; right:10px; z-index:100;"),
             unsafe_allow_html=True
         )
     except:
@@ -199,6 +112,7 @@ def admin_login(username, password):
 if not st.session_state.logged_in:
     menu = ["Home", "Signup", "Login"]
     choice = st.sidebar.selectbox("Menu", menu)
+    perf.page(choice)
     if choice == "Home":
         st.markdown("<div style='text-align:center;'>", unsafe_allow_html=True)
         display_main_logo()
@@ -211,7 +125,7 @@ if not st.session_state.logged_in:
         pw = st.text_input("Password", type='password')
         full_name = st.text_input("Full Name")
         age = st.number_input("Age", 0, 100)
-        gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+        gender = st.selectbox("Gender", repo.GENDERS)
         contact = st.text_input("Contact")
         if st.button("Signup"):
             signup(uname, pw, full_name, age, gender, contact)
@@ -249,14 +163,24 @@ else:
     if st.session_state.is_admin:
         action = st.sidebar.radio(
             "Admin Panel",
-            ["Admin Dashboard", "AI Insights", "Predict Shortage"]
+            ["Admin Dashboard", "AI Insights", "Predict Shortage", "Export Data", "Performance"]
         )
     else:
         action = st.sidebar.radio(
             "Menu",
-            ["Home","Add Donor","Manage Donors","Search Donor","View Donors","Record Donation","Issue Blood","View Stock"]
+            ["Home","Add Donor","Manage Donors","Search Donor","View Donors","Duplicates","Record Donation","Issue Blood","Transfer Stock","View Stock"]
         )
 
+    if st.session_state.is_admin:
+        with st.sidebar.expander("Database pool"):
+            stats = pool_stats()
+            st.write(f"Connections: {stats['opened']}/{stats['size']} ({stats['idle']} idle)")
+            st.write(f"Pool hits: {stats['hits']} · new connections: {stats['misses']}")
+            st.write(f"Waits: {stats['waits']} · total wait: {stats['wait_time'] * 1000:.1f} ms")
+            w = writer.stats()
+            st.write(f"Writes: {w['writes']} in {w['batches']} commits "
+                     f"(avg {w['avg_batch']:.1f}, largest {w['largest_batch']}) · queued: {w['queued']}")
+
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Account**")
     if st.sidebar.button("View Profile"):
@@ -269,6 +193,7 @@ else:
         st.rerun()
 
     # ------------------ Main Content ------------------
+    perf.page("Profile" if st.session_state.show_profile else action)
     if st.session_state.show_profile:
         profile = get_user_profile(st.session_state.username)
         if profile:
@@ -285,18 +210,11 @@ else:
             # ---------- Editable Fields ----------
             new_full_name = st.text_input("Full Name", full_name)
             new_age = st.number_input("Age", 0, 100, age)
-            new_gender = st.selectbox("Gender", ["Male","Female","Other"], ["Male","Female","Other"].index(gender))
+            new_gender = st.selectbox("Gender", repo.GENDERS, repo.GENDERS.index(gender))
             new_contact = st.text_input("Contact", contact)
 
             if st.button("Update Profile"):
-                db = connect_db()
-                cursor = db.cursor()
-                cursor.execute(
-                    "UPDATE Users SET FullName=?, Age=?, Gender=?, Contact=? WHERE Username=?",
-                    (new_full_name, new_age, new_gender, new_contact, st.session_state.username)
-                )
-                db.commit()
-                db.close()
+                repo.update_profile(st.session_state.username, new_full_name, new_age, new_gender, new_contact)
                 st.success("✅ Profile updated successfully!")
                 st.rerun()
 
@@ -309,88 +227,229 @@ else:
             st.subheader("Add New Donor")
             n = st.text_input("Name")
             a = st.number_input("Age", 0, 100)
-            g = st.selectbox("Gender", ["Male","Female","Other"])
-            bg = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'])
+            g = st.selectbox("Gender", repo.GENDERS)
+            bg = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
             ct = st.text_input("Contact")
             if st.button("Add Donor"):
                 add_donor(n, a, g, bg, ct)
 
+            st.markdown("---")
+            with st.expander("Bulk import from CSV / Excel"):
+                st.caption("Columns: Name, Age, Gender, Blood Group, Contact. "
+                           f"Ages {importer.AGE_RANGE[0]}-{importer.AGE_RANGE[1]}; invalid rows are skipped and listed.")
+                upload = st.file_uploader("Donor file", type=["csv", "xlsx"])
+                if upload is not None and st.button("Import Donors"):
+                    bar = st.progress(0.0)
+                    size = max(upload.size, 1)
+                    def show_progress(report):
+                        bar.progress(min(upload.tell() / size, 1.0),
+                                     text=f"{report.rows_read:,} rows read · {report.throughput:,.0f} rows/s")
+                    try:
+                        report = importer.import_donors(upload, upload.name, progress=show_progress)
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        bar.progress(1.0, text="Done")
+                        st.success(f"✅ Imported {report.inserted:,} of {report.rows_read:,} donors "
+                                   f"in {report.elapsed:.1f}s ({report.throughput:,.0f} rows/s)")
+                        if report.error_count:
+                            import pandas as pd
+                            st.warning(f"⚠️ {report.error_count:,} rows skipped"
+                                       + (f" (first {len(report.errors):,} shown)" if report.error_count > len(report.errors) else ""))
+                            render_centered_table(pd.DataFrame(report.errors, columns=["Line", "Problem"]))
+
         elif action == "Manage Donors":
-            donors = view_all_donors()
-            if donors:
-                df = pd.DataFrame(donors, columns=["ID","Name","Age","Gender","Blood Group","Contact"])
-                selected_id = st.selectbox("Select Donor to Edit/Delete", df["ID"])
-                donor_row = df[df["ID"]==selected_id].iloc[0]
-
-                name = st.text_input("Name", donor_row["Name"])
-                age = st.number_input("Age", 0, 100, donor_row["Age"])
-                gender = st.selectbox("Gender", ["Male","Female","Other"], ["Male","Female","Other"].index(donor_row["Gender"]))
-                blood_group = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'], 
-                                           ['A+','A-','B+','B-','O+','O-','AB+','AB-'].index(donor_row["Blood Group"]))
-                contact = st.text_input("Contact", donor_row["Contact"])
+            # One primary-key lookup; IDs come from View Donors or Search Donor.
+            selected_id = int(st.number_input("Donor ID to Edit/Delete", min_value=1, step=1,
+                                              help="Find a donor's ID under View Donors or Search Donor."))
+            donor_row = get_donor(selected_id)
+            if donor_row:
+                _, donor_name, donor_age, donor_gender, donor_group, donor_contact = donor_row
+                name = st.text_input("Name", donor_name)
+                age = st.number_input("Age", 0, 100, donor_age)
+                gender = st.selectbox("Gender", repo.GENDERS, repo.GENDERS.index(donor_gender))
+                blood_group = st.selectbox("Blood Group", repo.BLOOD_GROUPS, 
+                                           repo.BLOOD_GROUPS.index(donor_group))
+                contact = st.text_input("Contact", donor_contact)
 
                 if st.button("Update Donor"):
-                    db = connect_db()
-                    cursor = db.cursor()
-                    cursor.execute("UPDATE Donors SET Name=?, Age=?, Gender=?, BloodGroup=?, Contact=? WHERE DonorID=?",
-                                   (name, age, gender, blood_group, contact, selected_id))
-                    db.commit()
-                    db.close()
+                    repo.update_donor(selected_id, name, age, gender, blood_group, contact)
                     st.success("✅ Donor updated successfully!")
                     st.rerun()
 
                 if st.button("Delete Donor"):
-                    db = connect_db()
-                    cursor = db.cursor()
-                    cursor.execute("DELETE FROM Donors WHERE DonorID=?", (selected_id,))
-                    db.commit()
-                    db.close()
-                    st.success("✅ Donor deleted successfully!")
-                    st.rerun()
+                    if repo.delete_donor(selected_id) is None:
+                        st.error("❌ Donor not found; it may already have been deleted.")
+                    else:
+                        st.success("✅ Donor deleted successfully!")
+                        st.rerun()
             else:
-                st.info("No donors found.")
+                st.info("No donor with this ID.")
 
         elif action == "Search Donor":
-            st.subheader("Search Donor by Blood Group")
-            bg = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'])
+            st.subheader("Search Donor")
+            text = st.text_input("Name or contact contains", placeholder="e.g. part of a name or phone number")
+            bg = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
+            compatible = st.checkbox("Include compatible donor groups")
+            eligible_only = st.checkbox("Only donors eligible to donate today")
+            any_group = bool(text.strip()) and st.checkbox("Search all blood groups")
             if st.button("Search"):
-                donors = search_donor(bg)
-                if donors:
-                    df = pd.DataFrame(donors, columns=["ID","Name","Age","Gender","Contact"])
-                    render_centered_table(df)
+                st.session_state.donor_search_group = bg
+            if text.strip():
+                from lifelink import compatibility, search
+                if search.match_expression(text) is None:
+                    st.info(f"Type at least {search.MIN_TERM} characters of a name or contact.")
                 else:
-                    st.info("No donors found for this blood group.")
+                    if any_group:
+                        groups = ()
+                    else:
+                        groups = tuple(compatibility.compatible_groups(bg)) if compatible else (bg,)
+                    on = date.today().isoformat() if eligible_only else None
+                    paginated_table("text_search_pages",
+                                    lambda after, limit: with_last_donation(
+                                        search.find_donors(text, groups, on, after, limit)),
+                                    render_centered_table, DONOR_SEARCH_HEADERS,
+                                    view=(text, groups, on), empty="No donors match.")
+            elif st.session_state.get("donor_search_group") and eligible_only:
+                from lifelink import compatibility, eligibility
+                recipient = st.session_state.donor_search_group
+                groups = tuple(compatibility.compatible_groups(recipient)) if compatible else (recipient,)
+                if compatible:
+                    st.caption("Compatible groups, best match first: " + ", ".join(groups))
+                st.caption("Deferral after donating: "
+                           + ", ".join(f"{g} {d} days" for g, d in eligibility.DEFERRAL_DAYS.items())
+                           + f", otherwise {eligibility.DEFAULT_DEFERRAL} days.")
+                today = date.today().isoformat()
+                paginated_table("eligible_search_pages",
+                                lambda after, limit: with_last_donation(
+                                    eligibility.eligible_donor_page(groups, today, after, limit)),
+                                render_centered_table, DONOR_SEARCH_HEADERS,
+                                view=(groups, today), empty="No eligible donors found.")
+            elif st.session_state.get("donor_search_group") and compatible:
+                from lifelink import compatibility
+                recipient = st.session_state.donor_search_group
+                st.caption("Compatible groups, best match first: "
+                           + ", ".join(compatibility.compatible_groups(recipient)))
+                paginated_table("compatible_search_pages",
+                                lambda after, limit: compatibility.compatible_donor_page(recipient, after, limit),
+                                render_centered_table, DONOR_HEADERS,
+                                view=(recipient,), empty="No compatible donors found.")
+            elif st.session_state.get("donor_search_group"):
+                paginated_donor_table("search_donor_pages", render_centered_table,
+                                      blood_group=st.session_state.donor_search_group)
 
         elif action == "View Donors":
             st.subheader("All Donors")
-            donors = view_all_donors()
-            if donors:
-                df = pd.DataFrame(donors, columns=["ID","Name","Age","Gender","Blood Group","Contact"])
-                render_centered_table(df)
-            else:
-                st.info("No donors found.")
+            paginated_donor_table("view_donors_pages", render_centered_table)
+
+        elif action == "Duplicates":
+            from lifelink import dedup
+            st.subheader("Possible Duplicate Donors")
+            if st.button("Scan All Donors"):
+                with st.spinner("Comparing donors that share a contact or a similar name..."):
+                    stats = dedup.scan()
+                st.success(f"✅ {stats['candidates']:,} possible duplicates from {stats['comparisons']:,} comparisons "
+                           f"in {stats['seconds']:.1f}s")
+            pairs = dedup.candidates(limit=25)
+            if not pairs:
+                st.info("No possible duplicates waiting for review.")
+            elif len(pairs) == 25:
+                st.caption("Showing the 25 most likely pairs; more appear as these are resolved.")
+            for score, reasons, a_id, a_name, a_bg, a_contact, b_id, b_name, b_bg, b_contact in pairs:
+                with st.container(border=True):
+                    st.write(f"**{score:.0%} match** · {reasons}")
+                    c1, c2 = st.columns(2)
+                    c1.write(f"#{a_id} · {a_name} · {a_bg} · {a_contact}")
+                    c2.write(f"#{b_id} · {b_name} · {b_bg} · {b_contact}")
+                    k1, k2, k3 = st.columns(3)
+                    if k1.button(f"Keep #{a_id}", key=f"dup_keep_{a_id}_{b_id}"):
+                        dedup.merge(a_id, b_id)
+                        st.rerun()
+                    if k2.button(f"Keep #{b_id}", key=f"dup_keep_{b_id}_{a_id}"):
+                        dedup.merge(b_id, a_id)
+                        st.rerun()
+                    if k3.button("Not a duplicate", key=f"dup_dismiss_{a_id}_{b_id}"):
+                        dedup.dismiss(a_id, b_id)
+                        st.rerun()
 
         elif action == "Record Donation":
             st.subheader("Record Donation")
+            center = st.selectbox("Center", slots.CENTERS, index=slots.CENTERS.index(slots.HOME_CENTER))
             did = st.number_input("Donor ID", min_value=0)
-            bg = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'])
+            bg = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
+            component = st.selectbox("Component", ["Whole Blood", "Red Cells", "Platelets", "Plasma"])
             u = st.number_input("Units", min_value=1)
             if st.button("Record Donation"):
-                update_stock(bg, u, "Donation", did)
+                update_stock(bg, u, "Donation", did, component, center)
 
         elif action == "Issue Blood":
             st.subheader("Issue Blood")
-            bg = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'])
+            center = st.selectbox("Center", slots.CENTERS, index=slots.CENTERS.index(slots.HOME_CENTER))
+            bg = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
             u = st.number_input("Units", min_value=1)
             if st.button("Issue Blood"):
-                update_stock(bg, u, "Issue")
+                update_stock(bg, u, "Issue", center=center)
+
+            stock = dict(repo.view_center_stock(center))
+            if stock.get(bg, 0) < u:
+                import pandas as pd
+                from lifelink import compatibility
+                st.markdown("---")
+                st.write("### Compatible Allocation Plan")
+                allocation, short = compatibility.plan(bg, u, stock)
+                if allocation:
+                    render_centered_table(pd.DataFrame(allocation, columns=["Blood Group", "Units"]))
+                if short:
+                    st.warning(f"⚠️ {short} units cannot be covered by any compatible group.")
+                elif st.button("Issue Using Plan"):
+                    try:
+                        ledger.apply_batch([ledger.Movement(group, units, "Issue", center=center)
+                                            for group, units in allocation])
+                    except repo.InsufficientStock:
+                        st.error("❌ Stock changed while planning, please try again.")
+                    else:
+                        st.success("✅ Issue recorded across compatible groups!")
+
+        elif action == "Transfer Stock":
+            st.subheader("Transfer Stock")
+            c1, c2 = st.columns(2)
+            from_center = c1.selectbox("From", slots.CENTERS, index=slots.CENTERS.index(slots.HOME_CENTER))
+            to_center = c2.selectbox("To", [c for c in slots.CENTERS if c != from_center])
+            bg = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
+            available = dict(repo.view_center_stock(from_center)).get(bg, 0)
+            st.caption(f"{from_center} holds {available} units of {bg}.")
+            u = st.number_input("Units", min_value=1)
+            if st.button("Transfer"):
+                try:
+                    repo.transfer_stock(bg, u, from_center, to_center)
+                except repo.InsufficientStock:
+                    st.error(f"❌ {from_center} does not have {u} usable units of {bg}.")
+                else:
+                    st.success(f"✅ Moved {u} units of {bg} from {from_center} to {to_center}.")
+
+            transfers = repo.recent_transfers()
+            if transfers:
+                import pandas as pd
+                st.markdown("---")
+                st.write("### Recent Transfers")
+                render_centered_table(pd.DataFrame(transfers, columns=["Date", "Blood Group", "Units", "From", "To"]))
 
         elif action == "View Stock":
+            import pandas as pd
+            import altair as alt
             st.subheader("Current Blood Stock")
             stock = view_stock()
             df_stock = pd.DataFrame(stock, columns=["Blood Group","Units"])
             render_centered_table(df_stock)
 
+            st.markdown("---")
+            st.write("### Stock by Center")
+            by_center = pd.DataFrame(repo.stock_by_center(), columns=["Center", "Blood Group", "Units"])
+            df_centers = by_center.pivot(index="Center", columns="Blood Group", values="Units").fillna(0).astype(int)
+            df_centers = df_centers.reindex(columns=[bg for bg in repo.BLOOD_GROUPS if bg in df_centers.columns])
+            df_centers["Total"] = df_centers.sum(axis=1)
+            render_centered_table(df_centers.reset_index())
+
             st.markdown("---")
             st.write("### Blood Stock Levels")
             chart1 = alt.Chart(df_stock).mark_bar().encode(
@@ -398,35 +457,210 @@ else:
                 y='Units',
                 color='Blood Group'
             )
-            st.altair_chart(chart1, use_container_width=True)
+            with perf.span("altair"):
+                st.altair_chart(chart1, use_container_width=True)
+
+            from lifelink import inventory
+            st.markdown("---")
+            st.write("### Expiring Soon")
+            days = st.slider("Expiring within (days)", 1, 14, 7)
+            today = date.today().isoformat()
+            expiring = inventory.expiring_soon(tuple(repo.BLOOD_GROUPS), tuple(slots.CENTERS), today, days)
+            if expiring:
+                df_expiring = pd.DataFrame(expiring, columns=["Center", "Blood Group", "Expiry", "Units"])
+                df_expiring["Status"] = ["Expired" if day < today else "Expiring" for day in df_expiring["Expiry"]]
+                render_centered_table(df_expiring)
+            else:
+                st.info(f"No units expire in the next {days} days.")
+            if any(day < today for _, _, day, _ in expiring) and st.button("Write Off Expired Units"):
+                written_off = ledger.expire_due()
+                st.success(f"✅ Wrote off {sum(written_off.values())} expired units.")
+
+        elif action == "Admin Dashboard" and st.session_state.is_admin:
+            import pandas as pd
+            from lifelink import kpi
+            st.subheader("Admin Dashboard")
+            today = date.today().isoformat()
+            kpis = kpi.snapshot(today)
+            donated, issued = kpis["movements"]["Donation"], kpis["movements"]["Issue"]
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Donors", f"{sum(kpis['donors'].values()):,}")
+            c2.metric("Units in Stock", f"{sum(kpis['stock'].values()):,}")
+            c3.metric("Donated Today", f"{donated['today']:,}")
+            c4.metric("Issued Today", f"{issued['today']:,}")
+            if kpis["low_stock"]:
+                st.warning(f"⚠️ Low stock (under {kpi.LOW_STOCK} units): "
+                           + ", ".join(f"{bg} ({kpis['stock'][bg]})" for bg in kpis["low_stock"]))
+
+            st.write("### Stock Movements")
+            render_centered_table(pd.DataFrame(
+                [(label, counts["today"], counts["week"], counts["month"])
+                 for label, counts in (("Donated", donated), ("Issued", issued),
+                                       ("Expired", kpis["movements"]["Expired"]))],
+                columns=["Units", "Today", "Last 7 Days", "Last 30 Days"]))
+
+            c1, c2 = st.columns(2)
+            with c1:
+                st.write("### Blood Groups")
+                render_centered_table(pd.DataFrame(
+                    [(bg, kpis["donors"].get(bg, 0), kpis["stock"].get(bg, 0)) for bg in repo.BLOOD_GROUPS],
+                    columns=["Blood Group", "Donors", "Units in Stock"]))
+            with c2:
+                st.write("### Bookings by Center")
+                render_centered_table(pd.DataFrame(
+                    [(center, kpis["bookings_today"].get(center, 0), kpis["bookings"].get(center, 0))
+                     for center in slots.CENTERS],
+                    columns=["Center", "Today", f"Next {kpi.BOOKING_DAYS} Days"]))
+
+            st.markdown("---")
+            st.write("### Read Cache")
+            stats = cache.stats()
+            rows = [(name, c["hits"], c["misses"], f"{c['hits'] / max(c['hits'] + c['misses'], 1):.0%}")
+                    for name, c in sorted(stats["functions"].items())]
+            if rows:
+                render_centered_table(pd.DataFrame(rows, columns=["Query", "Hits", "Misses", "Hit Rate"]))
+            else:
+                st.info("No cached reads yet.")
+            st.caption(f"{stats['entries']} cached results · table generations: "
+                       + ", ".join(f"{t}={g}" for t, g in sorted(stats["generations"].items())))
+            ai = insights.stats()
+            st.caption(f"AI insights: {ai['hits']} cached · {ai['coalesced']} joined in flight · "
+                       f"{ai['misses']} generated")
 
         elif action == "AI Insights" and st.session_state.is_admin:
             st.subheader("🤖 Gemini AI Insights")
-            if gemini_model is None:
+            ai_backend = get_ai_backend()
+            if ai_backend is None:
                 st.warning("⚠️ AI model not configured. Check your GEMINI_API_KEY in secrets.")
             else:
+                import pandas as pd
                 stock = view_stock()
                 df_stock = pd.DataFrame(stock, columns=["Blood Group", "Units"])
 
                 st.write("### Current Stock Data")
                 st.dataframe(df_stock)
 
-                prompt = f"""
-                You are an AI healthcare analyst.
-                Below is the current blood stock data.
-
-                {df_stock}
-
-                1. Identify blood groups at risk
-                2. Predict shortages
-                3. Give clear, actionable advice for hospital admins
-                """
-
+                # Generation runs on a background thread and is cached per stock snapshot,
+                # so reruns and other admin sessions pick up the same job instead of waiting again.
                 if st.button("Generate AI Insights"):
+                    job = insights.request_insights(stock, ai_backend)
+                else:
+                    job = insights.peek(stock, ai_backend)
+
+                if job is not None:
+                    output = st.empty()
+                    with st.spinner("Generating insights..."):
+                        while not job.done():
+                            output.markdown(job.text)
+                            time.sleep(0.2)
                     try:
-                        response = gemini_model.generate_content(prompt)
+                        output.markdown(job.result())
                         st.success("AI Analysis Complete")
-                        st.write(response.text)
                     except Exception as e:
+                        output.empty()
                         st.error("❌ AI call failed. Check your API key and model name.")
                         st.write(str(e))
+
+        elif action == "Predict Shortage" and st.session_state.is_admin:
+            import pandas as pd
+            import altair as alt
+            from lifelink import forecast
+            st.subheader("📉 Predict Shortage")
+            st.caption("Local weekly-seasonal forecast of each group's daily net flow (donations minus issues).")
+            c1, c2 = st.columns(2)
+            horizon = c1.slider("Forecast horizon (days)", 7, 120, 30)
+            confidence = c2.selectbox("Confidence band", [0.8, 0.9, 0.95], index=1, format_func=lambda c: f"{c:.0%}")
+
+            with perf.span("forecast", "compute"):
+                results = forecast.forecast(dict(view_stock()), horizon, confidence, today=date.today().isoformat())
+            fmt = lambda d: f"{d}" if d is not None else f"> {horizon}"
+            summary = pd.DataFrame(
+                [(r["blood_group"], r["stock"], round(r["daily_net_flow"], 2), fmt(r["days_to_stockout"]),
+                  fmt(r["days_to_stockout_low"]), fmt(r["days_to_stockout_high"])) for r in results],
+                columns=["Blood Group", "Units", "Net Units/Day", "Days to Stockout", "Earliest", "Latest"])
+            render_centered_table(summary)
+
+            at_risk = [r["blood_group"] for r in results if r["days_to_stockout_low"] is not None]
+            if at_risk:
+                st.warning(f"⚠️ Possible stockout within {horizon} days: {', '.join(at_risk)}")
+            else:
+                st.success(f"No stockout expected within {horizon} days.")
+
+            group = st.selectbox("Projection for", [r["blood_group"] for r in results])
+            r = next(r for r in results if r["blood_group"] == group)
+            df_proj = pd.DataFrame({"Day": range(1, horizon + 1), "Expected": r["expected"],
+                                    "Lower": r["lower"], "Upper": r["upper"]})
+            band = alt.Chart(df_proj).mark_area(opacity=0.25).encode(x="Day:Q", y="Lower:Q", y2="Upper:Q")
+            line = alt.Chart(df_proj).mark_line().encode(x="Day:Q", y=alt.Y("Expected:Q", title="Projected Units"))
+            with perf.span("altair"):
+                st.altair_chart(band + line, use_container_width=True)
+
+        elif action == "Export Data" and st.session_state.is_admin:
+            st.subheader("Export Data")
+            c1, c2 = st.columns(2)
+            source = c1.selectbox("Table", list(export.SOURCES), format_func=str.title)
+            fmt = c2.selectbox("Format", list(export.FORMATS), format_func=str.upper)
+            filters = {}
+            if source == "transactions":
+                d1, d2 = st.columns(2)
+                start = d1.date_input("From", date.today() - timedelta(days=30))
+                end = d2.date_input("To", date.today())
+                filters = {"start": start.isoformat(), "end": (end + timedelta(days=1)).isoformat()}
+
+            # Rows are streamed off the cursor chunk by chunk and only when the button is clicked.
+            st.download_button(
+                f"Download {source}.{fmt}",
+                data=lambda: export.StreamReader(export.stream(source, fmt, **filters)),
+                file_name=f"lifelink_{source}.{fmt}",
+                mime=export.FORMATS[fmt],
+            )
+
+        elif action == "Performance" and st.session_state.is_admin:
+            import pandas as pd
+            st.subheader("Performance")
+            enabled = st.toggle("Record reruns and queries", value=perf.ENABLED,
+                                help="Process-wide; also on at startup with LIFELINK_PERF=1.")
+            if enabled != perf.ENABLED:
+                perf.enable(enabled)
+                st.rerun()
+            st.caption("Timings cover every session in this process: SQL, DataFrame/table rendering, charts and AI calls.")
+
+            st.write("### Slowest pages")
+            pages = perf.slowest_pages()
+            if pages:
+                render_centered_table(pd.DataFrame(
+                    [(p["app"], p["page"], p["reruns"], round(p["p50_ms"], 1), round(p["p95_ms"], 1),
+                      round(p["max_ms"], 1), round(p["avg_queries"], 1), round(p["avg_query_ms"], 1)) for p in pages],
+                    columns=["App", "Page", "Reruns", "p50 ms", "p95 ms", "Max ms", "Queries/Rerun", "SQL ms/Rerun"]))
+            else:
+                st.info("Nothing recorded yet. Turn recording on and use the apps.")
+
+            st.write("### Slowest queries")
+            queries = perf.slowest_queries()
+            if queries:
+                render_centered_table(pd.DataFrame(
+                    [(q["sql"][:120], q["calls"], q["statements"], round(q["total_ms"], 1), round(q["avg_ms"], 2),
+                      round(q["max_ms"], 2)) for q in queries],
+                    columns=["Query", "Calls", "Statements", "Total ms", "Avg ms", "Max ms"]))
+
+            st.write("### Recent reruns")
+            for r in perf.recent(20):
+                spans = sorted(r.spans, key=lambda s: s[3], reverse=True)[:3]
+                st.write(f"**{r.app} / {r.page}** · {r.wall * 1000:.1f} ms · {r.queries} queries "
+                         f"({r.query_time * 1000:.1f} ms)" + (" · interrupted" if r.interrupted else "")
+                         + "".join(f" · {name[:40]} {duration * 1000:.1f} ms" for name, _, _, duration in spans))
+
+            st.markdown("---")
+            c1, c2 = st.columns([1, 3])
+            fmt = c1.selectbox("Format", ["json", "otlp"], format_func=str.upper)
+            c2.download_button(
+                "Download recorded data",
+                data=lambda: perf.dumps(fmt),
+                file_name=f"lifelink-perf-{fmt}.json",
+                mime="application/json",
+            )
+            if st.button("Clear recorded data"):
+                perf.reset()
+                st.rerun()
+
+perf.end()
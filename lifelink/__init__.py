@@ -0,0 +1 @@
+# LifeLink shared backend used by admin.py and user.py
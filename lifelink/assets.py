@@ -0,0 +1,95 @@
+# lifelink/assets.py
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Relative paths resolve against the project root, so the same setting works on any machine.
+LOGO_PATH = os.environ.get("LIFELINK_LOGO", os.path.join("assets", "logo.jpeg"))
+
+# Widths the apps actually render the logo at.
+MAIN_LOGO_WIDTH = 300
+SMALL_LOGO_WIDTH = 60
+
+Asset = namedtuple("Asset", "data mime b64 sha width height")
+
+_lock = threading.Lock()
+_assets = {}
+
+
+def resolve(path):
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def _render(path, width):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.load()
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS)
+        # Keep transparency when the source has it; JPEG is much smaller otherwise.
+        if img.mode in ("RGBA", "LA", "P"):
+            fmt, mime = "PNG", "image/png"
+        else:
+            fmt, mime = "JPEG", "image/jpeg"
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, optimize=True)
+    data = buf.getvalue()
+    return Asset(
+        data=data,
+        mime=mime,
+        b64=base64.b64encode(data).decode(),
+        sha=hashlib.sha256(data).hexdigest()[:16],
+        width=img.width,
+        height=img.height,
+    )
+
+
+def image(width, path=None):
+    """Return the image at `path` resized to `width`, loading and encoding it once per process."""
+    path = resolve(path or LOGO_PATH)
+    key = (path, width)
+    asset = _assets.get(key)
+    if asset is None:
+        with _lock:
+            asset = _assets.get(key)
+            if asset is None:
+                asset = _assets[key] = _render(path, width)
+    return asset
+
+
+def logo(width=MAIN_LOGO_WIDTH):
+    return image(width)
+
+
+def data_uri(asset):
+    return f"data:{asset.mime};base64,{asset.b64}"
+
+
+_tags = {}
+
+
+def logo_tag(width=SMALL_LOGO_WIDTH, style=""):
+    """An <img> tag with the logo inlined; the string itself is built once per width/style."""
+    key = (width, style)
+    tag = _tags.get(key)
+    if tag is None:
+        asset = logo(width)
+        tag = _tags[key] = (
+            f"<img src='{data_uri(asset)}' data-sha='{asset.sha}' "
+            f"style='{style} width:{width}px;'>"
+        )
+    return tag
+
+
+def clear():
+    with _lock:
+        _assets.clear()
+        _tags.clear()
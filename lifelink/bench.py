@@ -0,0 +1,179 @@
+# lifelink/bench.py
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from lifelink import db, migrations, repository as repo, slots, synthetic
+
+BENCHMARKS = {}
+
+
+def benchmark(name, iterations=200):
+    """Register fn(ctx, i) as one timed operation; `iterations` is its default repeat count."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, iterations)
+        return fn
+    return register
+
+
+class Context:
+    """Random inputs drawn from whatever is in the database, fixed by the seed."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.users = db.fetchone("SELECT COUNT(*) FROM Users")[0]
+        self.today = date.today()
+
+    def username(self):
+        return f"user{self.rng.randrange(max(self.users, 1))}"
+
+    def blood_group(self):
+        groups = list(synthetic.BLOOD_GROUP_WEIGHTS)
+        return self.rng.choices(groups, weights=synthetic.BLOOD_GROUP_WEIGHTS.values())[0]
+
+
+# Reads go through .uncached: a cache hit costs microseconds, the interesting
+# number is what every session pays right after a write invalidates it.
+@benchmark("login", 1000)
+def _login(ctx, i):
+    return repo.login(ctx.username(), synthetic.DEFAULT_PASSWORD)
+
+
+@benchmark("search_donor", 50)
+def _search_donor(ctx, i):
+    return repo.search_donor.uncached(ctx.blood_group())
+
+
+@benchmark("view_all_donors", 5)
+def _view_all_donors(ctx, i):
+    return repo.view_all_donors.uncached()
+
+
+@benchmark("donor_page", 500)
+def _donor_page(ctx, i):
+    return repo.donor_page.uncached(ctx.blood_group(), None, 50)
+
+
+@benchmark("update_stock", 500)
+def _update_stock(ctx, i):
+    # Donate then issue the same unit, so repeated runs leave Stock where it was.
+    bg = repo.BLOOD_GROUPS[(i // 2) % len(repo.BLOOD_GROUPS)]
+    repo.update_stock(bg, 1, "Donation" if i % 2 == 0 else "Issue")
+
+
+@benchmark("create_booking", 500)
+def _create_booking(ctx, i):
+    day = (ctx.today + timedelta(days=ctx.rng.randint(1, 60))).isoformat()
+    try:
+        repo.create_booking(ctx.username(), "Bench User", "9000000000", ctx.blood_group(),
+                            ctx.rng.choice(slots.CENTERS), day, ctx.rng.choice(slots.TIME_SLOTS))
+    except repo.SlotFull:
+        return "full"
+
+
+@benchmark("get_user_bookings", 1000)
+def _get_user_bookings(ctx, i):
+    return repo.get_user_bookings.uncached(ctx.username())
+
+
+@benchmark("stock_trend", 50)
+def _stock_trend(ctx, i):
+    from lifelink import trend
+    days, _, levels = trend.stock_series.uncached(365)
+    return trend.downsample(days, levels)
+
+
+@benchmark("shortage_forecast", 20)
+def _shortage_forecast(ctx, i):
+    from lifelink import forecast
+    return forecast.forecast(dict(repo.view_stock.uncached()), model=forecast.fitted_models.uncached())
+
+
+def measure(fn, ctx, iterations, warmup=2):
+    for i in range(warmup):
+        fn(ctx, i)
+    timings = np.empty(iterations)
+    outcomes = {}
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        result = fn(ctx, i)
+        timings[i] = time.perf_counter() - t0
+        if isinstance(result, str):
+            outcomes[result] = outcomes.get(result, 0) + 1
+    total = time.perf_counter() - started
+    ms = timings * 1000
+    return {
+        "iterations": iterations,
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "ops_per_s": round(iterations / total, 1),
+        "outcomes": outcomes,
+    }
+
+
+def run(names=None, iterations=None, seed=0):
+    """Time each benchmark against the configured database; returns {name: stats}.
+
+    update_stock and create_booking write to the database, so point this at
+    a generated copy rather than a live one.
+    """
+    migrations.ensure_schema()
+    ctx = Context(seed)
+    results = {}
+    for name in names or BENCHMARKS:
+        fn, default = BENCHMARKS[name]
+        results[name] = measure(fn, ctx, iterations or default)
+    return results
+
+
+def report(results, baseline=None):
+    header = f"{'benchmark':<20}{'p50 ms':>10}{'p99 ms':>10}{'ops/s':>10}"
+    if baseline:
+        header += f"{'p50 vs base':>14}"
+    print(header)
+    for name, stats in results.items():
+        line = f"{name:<20}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['ops_per_s']:>10.1f}"
+        before = (baseline or {}).get(name)
+        if before and before["p50_ms"]:
+            line += f"{stats['p50_ms'] / before['p50_ms']:>13.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LifeLink hot paths against a (synthetic) database.")
+    parser.add_argument("db", help="database to benchmark; see `python -m lifelink.synthetic`")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--iterations", type=int, help="override every benchmark's repeat count")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file for comparing runs")
+    parser.add_argument("--baseline", help="earlier --json output to compare p50 against")
+    args = parser.parse_args(argv)
+
+    db.configure(args.db)
+    migrations.reset()
+    results = run(args.only, args.iterations, args.seed)
+    baseline = json.loads(Path(args.baseline).read_text())["results"] if args.baseline else None
+    report(results, baseline)
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "timestamp": time.time(),
+            "db": str(args.db),
+            "rows": synthetic.table_counts(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "results": results,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
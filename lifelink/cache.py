@@ -0,0 +1,116 @@
+# lifelink/cache.py
+import functools
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+from lifelink import db
+
+# Streamlit re-executes the page script but keeps imported modules, so this
+# state is shared by every session in the server process.
+MAX_ENTRIES = 512
+
+# The table generations live in the database (the Generations table), bumped in
+# the same transaction as the write, so admin.py and user.py -- separate server
+# processes -- invalidate each other's reads. A connection of our own that never
+# writes sees PRAGMA data_version change on any commit, from any process, and
+# only then are the generations read again.
+RECORD_SQL = """INSERT INTO Generations (TableName, Generation) VALUES (?, 1)
+                ON CONFLICT (TableName) DO UPDATE SET Generation = Generation + 1"""
+
+_lock = threading.Lock()
+_generations = defaultdict(int)
+_entries = OrderedDict()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_watch = None          # (pool, connection): ours only for PRAGMA data_version, reopened after db.configure()
+_seen_version = None
+
+
+def record(conn, *tables):
+    """Invalidate every cached read that depends on these tables once conn's transaction commits."""
+    conn.executemany(RECORD_SQL, [(table,) for table in sorted(set(tables))])
+
+
+def bump(*tables):
+    """record() in a transaction of its own, for changes made outside the writer."""
+    with db.transaction(immediate=True) as conn:
+        record(conn, *tables)
+
+
+def _sync():
+    # Called with _lock held.
+    global _watch, _seen_version
+    pool = db.get_pool()
+    if _watch is None or _watch[0] is not pool:
+        if _watch is not None:
+            _watch[1].close()
+            _entries.clear()
+            _generations.clear()
+        _watch = (pool, sqlite3.connect(pool.path, check_same_thread=False, isolation_level=None))
+        _seen_version = None
+    conn = _watch[1]
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if version == _seen_version:
+        return
+    try:
+        rows = conn.execute("SELECT TableName, Generation FROM Generations").fetchall()
+    except sqlite3.OperationalError:
+        return   # not migrated yet; try again on the next read
+    _seen_version = version
+    _generations.update(rows)
+
+
+def generation(table):
+    with _lock:
+        _sync()
+        return _generations[table]
+
+
+def _freeze(value):
+    # Cached rows are shared between sessions, so hand out immutable containers.
+    return tuple(value) if isinstance(value, list) else value
+
+
+def cached(*tables):
+    def decorate(fn):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                _sync()
+                key = (name, args, tuple(sorted(kwargs.items())), tuple(_generations[t] for t in tables))
+                if key in _entries:
+                    _entries.move_to_end(key)
+                    _stats[name]["hits"] += 1
+                    return _entries[key]
+                _stats[name]["misses"] += 1
+            value = _freeze(fn(*args, **kwargs))
+            with _lock:
+                # Drop the result if a writer bumped a table while we were reading.
+                _sync()
+                if key[3] == tuple(_generations[t] for t in tables):
+                    _entries[key] = value
+                    while len(_entries) > MAX_ENTRIES:
+                        _entries.popitem(last=False)
+            return value
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorate
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats():
+    """Per-function hit/miss counters, plus current entry count and table generations."""
+    with _lock:
+        _sync()
+        return {
+            "functions": {name: dict(counts) for name, counts in _stats.items()},
+            "entries": len(_entries),
+            "generations": dict(_generations),
+        }
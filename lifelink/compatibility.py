@@ -0,0 +1,121 @@
+# lifelink/compatibility.py
+import numpy as np
+
+from lifelink import cache, db, queryplan
+from lifelink.repository import BLOOD_GROUPS
+
+INDEX = {bg: i for i, bg in enumerate(BLOOD_GROUPS)}
+
+# Antigens as bits: A, B and RhD.
+_A, _B, _D = 1, 2, 4
+_ANTIGENS = np.array([(_A if "A" in bg else 0) | (_B if "B" in bg else 0) | (_D if bg.endswith("+") else 0)
+                      for bg in BLOOD_GROUPS])
+
+# RED_CELLS[r, d]: recipient r can receive red cells from donor d
+# (the donor carries no antigen the recipient lacks).
+RED_CELLS = (_ANTIGENS[None, :] & ~_ANTIGENS[:, None]) == 0
+# PLASMA[r, d]: recipient r can receive plasma from donor d. Plasma carries
+# antibodies instead of antigens, so ABO compatibility runs the other way
+# and RhD does not matter.
+_ABO = _ANTIGENS & (_A | _B)
+PLASMA = (_ABO[:, None] & ~_ABO[None, :]) == 0
+
+MATRICES = {"red_cells": RED_CELLS, "plasma": PLASMA}
+
+
+def _preference(matrix):
+    """Donor groups per recipient, best first; incompatible groups are pushed to the end.
+
+    The exact group comes first, then the substitute that is useful to the
+    fewest other recipients, so universal groups (O- for red cells, AB for
+    plasma) are kept back for patients who have no alternative. Among equally
+    useful substitutes, the more common Rh-positive group is drawn first.
+    """
+    reach = matrix.sum(axis=0)
+    n = len(BLOOD_GROUPS)
+    order = np.empty((n, n), dtype=np.intp)
+    for r in range(n):
+        key = [(not matrix[r, d], d != r, reach[d], not _ANTIGENS[d] & _D, d) for d in range(n)]
+        order[r] = sorted(range(n), key=key.__getitem__)
+    return order
+
+
+PREFERENCE = {name: _preference(m) for name, m in MATRICES.items()}
+
+
+def compatible_groups(recipient, component="red_cells"):
+    r = INDEX[recipient.upper()]
+    return [BLOOD_GROUPS[d] for d in PREFERENCE[component][r] if MATRICES[component][r, d]]
+
+
+# ------------------ ALLOCATION ------------------
+def plan_many(recipients, units, stock, component="red_cells"):
+    """Plan allocations for many requests at once against the same stock snapshot.
+
+    recipients: sequence of blood groups; units: units needed per request;
+    stock: {blood group: units}. Returns (take, short) where take[i, d] is the
+    number of units request i should draw from BLOOD_GROUPS[d] and short[i]
+    is what could not be covered. Requests are planned independently.
+    """
+    matrix, order = MATRICES[component], PREFERENCE[component]
+    r = np.fromiter((INDEX[g.upper()] for g in recipients), dtype=np.intp, count=len(recipients))
+    need = np.asarray(units, dtype=np.int64)
+    available = np.array([stock.get(bg, 0) for bg in BLOOD_GROUPS], dtype=np.int64).clip(min=0)
+
+    ranked = order[r]                                   # (n, 8) donor index by preference
+    avail = available[ranked] * matrix[r[:, None], ranked]
+    before = np.cumsum(avail, axis=1) - avail           # units covered by better-ranked groups
+    ranked_take = np.clip(need[:, None] - before, 0, avail)
+
+    take = np.zeros_like(ranked_take)
+    np.put_along_axis(take, ranked, ranked_take, axis=1)
+    return take, need - take.sum(axis=1)
+
+
+def plan(recipient, units, stock, component="red_cells"):
+    """Ranked plan for one request: ([(blood group, units), ...], units short)."""
+    take, short = plan_many([recipient], [units], stock, component)
+    ranked = PREFERENCE[component][INDEX[recipient.upper()]]
+    return [(BLOOD_GROUPS[d], int(take[0, d])) for d in ranked if take[0, d]], int(short[0])
+
+
+# ------------------ DONOR SEARCH ------------------
+DONOR_COLUMNS = "DonorID, Name, Age, Gender, BloodGroup, Contact"
+
+
+# Pinned to (BloodGroup, DonorID) so each arm is a seek in index order, whatever the statistics say.
+GROUP_DONORS_SQL = queryplan.register(
+    "compatible_donors_group",
+    f"""SELECT {DONOR_COLUMNS}, ? AS Rank FROM Donors INDEXED BY idx_donors_group_id
+        WHERE BloodGroup = ? AND DonorID > ? ORDER BY DonorID LIMIT ?""",
+    (0, "A+", 0, 51))
+
+
+def _compatible_donors_sql(n):
+    # One GROUP_DONORS_SQL index range per group, each capped at the page size and
+    # tagged with its rank, so the final LIMIT keeps the best-ranked groups.
+    arms = " UNION ALL ".join(f"SELECT * FROM ({GROUP_DONORS_SQL})" for _ in range(n))
+    return f"SELECT {DONOR_COLUMNS} FROM ({arms}) ORDER BY Rank, DonorID LIMIT ?"
+
+
+# Each arm is audited as compatible_donors_group; only the few capped rows are sorted.
+queryplan.register("compatible_donors", _compatible_donors_sql(4),
+                   (0, "A+", 0, 51, 1, "A-", 0, 51, 2, "O+", 0, 51, 3, "O-", 0, 51, 51), allow_scan=True)
+
+
+@cache.cached("Donors")
+def compatible_donor_page(recipient, after=None, limit=50, component="red_cells"):
+    """One page of donors whose group can supply `recipient`, best-ranked groups first, then by DonorID.
+
+    Returns (rows, cursor for the next page or None) like repository.donor_page;
+    the cursor is (group rank, DonorID), so groups already paged past are skipped.
+    """
+    groups = compatible_groups(recipient, component)
+    start, after_id = after or (0, 0)
+    params = [p for rank in range(start, len(groups))
+              for p in (rank, groups[rank], after_id if rank == start else 0, limit + 1)]
+    rows = db.fetchall(_compatible_donors_sql(len(groups) - start), (*params, limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (groups.index(rows[-1][4]), rows[-1][0])
@@ -0,0 +1,233 @@
+# lifelink/db.py
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from lifelink import perf
+
+# ------------------ CONFIG ------------------
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = Path(os.environ.get("LIFELINK_DB", BASE_DIR / "lifelink.db"))
+
+# Streamlit runs each session's script in its own thread; a handful of
+# connections covers the concurrently executing reruns.
+POOL_SIZE = int(os.environ.get("LIFELINK_POOL_SIZE", 8))
+POOL_TIMEOUT = 30.0
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+# Planner statistics are refreshed by PRAGMA optimize, which re-analyzes only the
+# tables that grew a lot since their last ANALYZE; analysis_limit keeps each pass
+# to a few milliseconds even on large tables.
+OPTIMIZE_INTERVAL = 300.0   # seconds between passes on a long-lived pool
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA analysis_limit=1000",
+)
+
+
+# ------------------ CONNECTION POOL ------------------
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = str(path)
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._opened = 0
+        self._cond = threading.Condition()
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "wait_time": 0.0}
+        self._optimized = time.monotonic()
+
+    def _open(self):
+        # isolation_level=None: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        # 0x10000: look at every table, not only those this connection has queried (SQLite 3.46+).
+        _optimize(conn, "PRAGMA optimize=0x10002")
+        return conn
+
+    def acquire(self):
+        with self._cond:
+            if self._idle:
+                self._stats["hits"] += 1
+                return self._idle.pop()
+            if self._opened < self.size:
+                self._opened += 1
+                self._stats["misses"] += 1
+                open_new = True
+            else:
+                open_new = False
+                start = time.perf_counter()
+                self._stats["waits"] += 1
+                if not self._cond.wait_for(lambda: self._idle, self.timeout):
+                    raise PoolTimeout(f"no connection available after {self.timeout}s")
+                self._stats["wait_time"] += time.perf_counter() - start
+                self._stats["hits"] += 1
+                return self._idle.pop()
+        if open_new:
+            try:
+                return self._open()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                raise
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        now = time.monotonic()
+        if now - self._optimized > OPTIMIZE_INTERVAL:
+            self._optimized = now
+            _optimize(conn)
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn in self._idle:
+                _optimize(conn)
+                conn.close()
+            self._opened -= len(self._idle)
+            self._idle.clear()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, size=self.size, opened=self._opened, idle=len(self._idle))
+
+
+def _optimize(conn, pragma="PRAGMA optimize"):
+    # Statistics are advisory: rather than wait for the write lock, a busy (or
+    # read-only) database keeps the old ones until the next pass.
+    conn.execute("PRAGMA busy_timeout=0")
+    try:
+        conn.execute(pragma)
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def configure(path=None, size=None):
+    """Point the shared pool at another database (tests, benchmarks)."""
+    global _pool, DB_PATH
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        if path is not None:
+            DB_PATH = Path(path)
+        _pool = ConnectionPool(DB_PATH, size or POOL_SIZE)
+    return _pool
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+# ------------------ QUERY HELPERS ------------------
+@contextmanager
+def connection():
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(immediate=False):
+    with connection() as conn:
+        if perf.ENABLED:
+            with perf.transaction(conn), _transaction(conn, immediate):
+                yield conn
+        else:
+            with _transaction(conn, immediate):
+                yield conn
+
+
+@contextmanager
+def _transaction(conn, immediate):
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def is_busy(exc):
+    return isinstance(exc, sqlite3.OperationalError) and (
+        "locked" in str(exc) or "busy" in str(exc))
+
+
+def retry_busy(fn, retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+    """Call fn(), retrying with exponential backoff while SQLite reports SQLITE_BUSY.
+
+    busy_timeout already waits inside SQLite; this covers the cases it gives
+    up on (e.g. a long checkpoint), so fn must be safe to run again.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as exc:
+            if not is_busy(exc) or attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def fetchone(sql, params=()):
+    with connection() as conn:
+        if perf.ENABLED:
+            with perf.query(sql):
+                return conn.execute(sql, params).fetchone()
+        return conn.execute(sql, params).fetchone()
+
+
+def fetchall(sql, params=()):
+    with connection() as conn:
+        if perf.ENABLED:
+            with perf.query(sql):
+                return conn.execute(sql, params).fetchall()
+        return conn.execute(sql, params).fetchall()
+
+
+def execute(sql, params=()):
+    with transaction() as conn:
+        return conn.execute(sql, params)
@@ -0,0 +1,296 @@
+# lifelink/dedup.py
+import argparse
+import difflib
+import re
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from lifelink import cache, db, eligibility, kpi, queryplan, writer
+
+# Pairs scoring at least this much are kept for review. Without any contact
+# evidence a pair tops out at 0.5, so a common name alone never qualifies.
+MIN_SCORE = 0.6
+MAX_BLOCK = 50      # donors sharing one contact beyond this are a placeholder number, not a person
+WINDOW = 5          # neighbours compared on each side within a phonetic-name block
+CHUNK = 10_000
+
+_SOUNDEX = {c: d for letters, d in (("BFPV", "1"), ("CGJKQSXZ", "2"), ("DT", "3"), ("L", "4"), ("MN", "5"), ("R", "6"))
+            for c in letters}
+
+DONOR_COLUMNS = "DonorID, Name, Age, Gender, BloodGroup, Contact, ContactKey, NameKey"
+
+CONTACT_BLOCK_SQL = queryplan.register(
+    "dedup_contact_block",
+    f"SELECT {DONOR_COLUMNS} FROM Donors WHERE ContactKey = ? AND DonorID <> ? LIMIT ?", ("9876543210", 1, MAX_BLOCK))
+# A donor's neighbours in its name block, by contact, so one-digit contact typos sit side by side.
+NAME_ABOVE_SQL = queryplan.register(
+    "dedup_name_above",
+    f"""SELECT {DONOR_COLUMNS} FROM Donors WHERE NameKey = ? AND ContactKey >= ? AND DonorID <> ?
+        ORDER BY ContactKey LIMIT ?""", ("M600 K426|O+", "9876543210", 1, WINDOW))
+NAME_BELOW_SQL = queryplan.register(
+    "dedup_name_below",
+    f"""SELECT {DONOR_COLUMNS} FROM Donors WHERE NameKey = ? AND ContactKey < ?
+        ORDER BY ContactKey DESC LIMIT ?""", ("M600 K426|O+", "9876543210", WINDOW))
+# Walks the open-pair index best score first and stops at the limit.
+OPEN_SQL = queryplan.register(
+    "duplicate_candidates",
+    """SELECT c.Score, c.Reasons, a.DonorID, a.Name, a.BloodGroup, a.Contact, b.DonorID, b.Name, b.BloodGroup, b.Contact
+       FROM DuplicateCandidates c JOIN Donors a ON a.DonorID = c.DonorA JOIN Donors b ON b.DonorID = c.DonorB
+       WHERE c.Status = 'open' ORDER BY c.Score DESC LIMIT ?""", (100,), allow_scan=True)
+FOR_DONOR_SQL = queryplan.register(
+    "duplicate_candidates_for",
+    """SELECT DonorB, Score FROM DuplicateCandidates WHERE DonorA = ? AND Status = 'open'
+       UNION ALL
+       SELECT DonorA, Score FROM DuplicateCandidates WHERE DonorB = ? AND Status = 'open'""", (1, 1))
+UPSERT_SQL = """INSERT INTO DuplicateCandidates (DonorA, DonorB, Score, Reasons, Status, Found)
+                VALUES (?, ?, ?, ?, 'open', ?)
+                ON CONFLICT (DonorA, DonorB) DO UPDATE SET Score = excluded.Score, Reasons = excluded.Reasons
+                WHERE Status = 'open'"""
+
+
+# ------------------ KEYS ------------------
+def contact_key(contact):
+    """The last 10 digits, so spacing, dashes and country codes do not matter; None if too short to tell."""
+    digits = re.sub(r"\D", "", str(contact or ""))
+    return digits[-10:] if len(digits) >= 6 else None
+
+
+def soundex(word):
+    letters = re.sub(r"[^A-Z]", "", word.upper())
+    if not letters:
+        return ""
+    code, last = letters[0], _SOUNDEX.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX.get(ch, "")
+        if digit and digit != last:
+            code += digit
+        if ch not in "HW":
+            last = digit
+    return (code + "000")[:4]
+
+
+def name_key(name, blood_group):
+    """Soundex of each name part in sorted order, plus the group: 'Meera Kulkarni' and 'Mira Kulkarni' agree."""
+    codes = sorted(filter(None, (soundex(part) for part in str(name or "").split())))
+    return " ".join(codes) + "|" + blood_group.upper() if codes else None
+
+
+def keys(name, blood_group, contact):
+    return contact_key(contact), name_key(name, blood_group)
+
+
+# ------------------ SCORING ------------------
+def _clean_name(name):
+    return " ".join(sorted(str(name or "").lower().split()))
+
+
+def score(a, b):
+    """(score, reasons) for two donor rows laid out as DONOR_COLUMNS."""
+    ca, cb = a[6], b[6]
+    if ca and ca == cb:
+        total, reasons = 0.5, ["same contact"]
+    elif ca and cb and len(ca) == len(cb) and sum(x != y for x, y in zip(ca, cb)) == 1:
+        total, reasons = 0.3, ["contact differs by one digit"]
+    else:
+        return 0.0, ""   # cannot reach MIN_SCORE; skip the name comparison
+    similarity = difflib.SequenceMatcher(None, _clean_name(a[1]), _clean_name(b[1])).ratio()
+    total += 0.3 * similarity
+    if similarity >= 0.8:
+        reasons.append(f"name {similarity:.0%} alike")
+    if a[4] == b[4]:
+        total += 0.1
+    else:
+        total -= 0.2
+        reasons.append("different blood group")
+    if a[3] == b[3]:
+        total += 0.05
+    if a[2] is not None and b[2] is not None and abs(a[2] - b[2]) <= 2:
+        total += 0.05
+    return round(total, 3), ", ".join(reasons)
+
+
+def _pair(a, b):
+    return (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+
+
+# ------------------ INCREMENTAL ------------------
+def check(conn, donor_id):
+    """Re-score one donor against its blocks; call in the transaction that inserted or edited it.
+
+    Returns [(other DonorID, score)] for the pairs kept.
+    """
+    forget(conn, donor_id)
+    row = conn.execute(f"SELECT {DONOR_COLUMNS} FROM Donors WHERE DonorID=?", (donor_id,)).fetchone()
+    if row is None:
+        return []
+    others = []
+    if row[6]:
+        others += conn.execute(CONTACT_BLOCK_SQL, (row[6], donor_id, MAX_BLOCK + 1)).fetchall()
+        if len(others) > MAX_BLOCK:
+            others = []
+        if row[7]:
+            others += conn.execute(NAME_ABOVE_SQL, (row[7], row[6], donor_id, WINDOW)).fetchall()
+            others += conn.execute(NAME_BELOW_SQL, (row[7], row[6], WINDOW)).fetchall()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    found = {}
+    for other in others:
+        value, reasons = score(row, other)
+        if value >= MIN_SCORE and other[0] not in found:
+            found[other[0]] = value
+            conn.execute(UPSERT_SQL, (*_pair(row, other), value, reasons, now))
+    return sorted(found.items(), key=lambda item: -item[1])
+
+
+def forget(conn, donor_id):
+    """Drop a donor's open candidate pairs (before re-scoring it, or when it is deleted)."""
+    conn.execute("DELETE FROM DuplicateCandidates WHERE DonorA = ? AND Status = 'open'", (donor_id,))
+    conn.execute("DELETE FROM DuplicateCandidates WHERE DonorB = ? AND Status = 'open'", (donor_id,))
+
+
+def fill_keys(conn):
+    """Compute blocking keys for donors written without them (bulk loads, rows from before keys existed)."""
+    last, filled = 0, 0
+    while True:
+        rows = conn.execute("""SELECT DonorID, Name, BloodGroup, Contact FROM Donors
+                               WHERE DonorID > ? AND NameKey IS NULL ORDER BY DonorID LIMIT ?""",
+                            (last, CHUNK)).fetchall()
+        if not rows:
+            return filled
+        conn.executemany("UPDATE Donors SET ContactKey=?, NameKey=? WHERE DonorID=?",
+                         [(*keys(name, bg or "", contact), donor_id) for donor_id, name, bg, contact in rows])
+        filled += len(rows)
+        last = rows[-1][0]
+
+
+# ------------------ BATCH ------------------
+def _contact_pairs(conn, stats):
+    block, current = [], None
+
+    def flush():
+        if 1 < len(block) <= MAX_BLOCK:
+            for i, a in enumerate(block):
+                for b in block[i + 1:]:
+                    stats["comparisons"] += 1
+                    yield a, b
+
+    for row in conn.execute(f"SELECT {DONOR_COLUMNS} FROM Donors WHERE ContactKey IS NOT NULL ORDER BY ContactKey"):
+        if row[6] != current:
+            yield from flush()
+            block, current = [], row[6]
+        block.append(row)
+    yield from flush()
+
+
+def _name_pairs(conn, stats):
+    # Sorted neighbourhood: walk each phonetic-name block in contact order, comparing each
+    # donor with the WINDOW before it, so a block of any size costs O(size * WINDOW).
+    recent, current = deque(maxlen=WINDOW), None
+    for row in conn.execute(f"""SELECT {DONOR_COLUMNS} FROM Donors WHERE NameKey IS NOT NULL AND ContactKey IS NOT NULL
+                                ORDER BY NameKey, ContactKey"""):
+        if row[7] != current:
+            recent.clear()
+            current = row[7]
+        for other in recent:
+            stats["comparisons"] += 1
+            yield other, row
+        recent.append(row)
+
+
+def scan(progress=None):
+    """Batch pass over every donor: fill missing keys, then score each block. Returns a stats dict.
+
+    Reads stream off one connection and only the pairs that qualify are
+    kept in memory; dismissed pairs stay dismissed.
+    """
+    started = time.perf_counter()
+    stats = {"keys_filled": 0, "comparisons": 0, "candidates": 0}
+    with db.transaction(immediate=True) as conn:
+        stats["keys_filled"] = fill_keys(conn)
+    found = {}
+    with db.connection() as conn:
+        for name, pairs in (("contact", _contact_pairs), ("name", _name_pairs)):
+            if progress:
+                progress(name, stats)
+            for a, b in pairs(conn, stats):
+                pair = _pair(a, b)
+                if pair in found:
+                    continue
+                value, reasons = score(a, b)
+                if value >= MIN_SCORE:
+                    found[pair] = (value, reasons)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db.transaction(immediate=True) as conn:
+        conn.executemany(UPSERT_SQL, [(a, b, value, reasons, now) for (a, b), (value, reasons) in found.items()])
+        cache.record(conn, "Donors", "DuplicateCandidates")
+    stats["candidates"] = len(found)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+# ------------------ REVIEW ------------------
+@cache.cached("Donors", "DuplicateCandidates")
+def candidates(limit=100):
+    """Open pairs, best first: (score, reasons, id, name, group, contact, id, name, group, contact)."""
+    return db.fetchall(OPEN_SQL, (limit,))
+
+
+@cache.cached("DuplicateCandidates")
+def candidates_for(donor_id):
+    """[(other DonorID, score)] of a donor's open pairs, best first."""
+    return sorted(db.fetchall(FOR_DONOR_SQL, (donor_id, donor_id)), key=lambda row: -row[1])
+
+
+def dismiss(donor_a, donor_b):
+    a, b = sorted((donor_a, donor_b))
+    sql = "UPDATE DuplicateCandidates SET Status = 'dismissed' WHERE DonorA=? AND DonorB=?"
+    writer.write(lambda conn: conn.execute(sql, (a, b)).rowcount, "DuplicateCandidates")
+
+
+def merge(keep_id, drop_id):
+    """Fold donor drop_id into keep_id and delete it; returns the number of transactions re-pointed.
+
+    The kept record's details win. Its donation history, lots and last
+    donation date take over the merged donor's.
+    """
+    if keep_id == drop_id:
+        raise ValueError("cannot merge a donor into itself")
+
+    def run(conn):
+        dropped = conn.execute("SELECT LastDonation FROM Donors WHERE DonorID=?", (drop_id,)).fetchone()
+        if dropped is None or conn.execute("SELECT 1 FROM Donors WHERE DonorID=?", (keep_id,)).fetchone() is None:
+            raise LookupError(f"donor {keep_id if dropped else drop_id} does not exist")
+        moved = conn.execute("UPDATE Transactions SET DonorID=? WHERE DonorID=?", (keep_id, drop_id)).rowcount
+        conn.execute("UPDATE Lots SET DonorID=? WHERE DonorID=?", (keep_id, drop_id))
+        if dropped[0]:
+            eligibility.record_donation(conn, keep_id, dropped[0])
+        forget(conn, drop_id)   # the merge itself lives on in DonorMerges
+        group = conn.execute("DELETE FROM Donors WHERE DonorID=? RETURNING BloodGroup", (drop_id,)).fetchone()[0]
+        kpi.count_donor(conn, group, None)
+        conn.execute("INSERT INTO DonorMerges (KeptID, MergedID, Transactions, Date) VALUES (?, ?, ?, datetime('now'))",
+                     (keep_id, drop_id, moved))
+        return moved
+
+    return writer.write(run, "Donors", "Transactions", "Lots", "DuplicateCandidates", "KpiSnapshot")
+
+
+# ------------------ CLI ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find likely duplicate donors across the whole registry.")
+    parser.add_argument("db", nargs="?", help="database file (default: LIFELINK_DB or lifelink.db)")
+    args = parser.parse_args(argv)
+
+    from lifelink import migrations
+    if args.db:
+        db.configure(args.db)
+    migrations.ensure_schema()
+    stats = scan(progress=lambda name, s: print(f"{name} blocks · {s['comparisons']:,} comparisons so far"))
+    print(f"{stats['candidates']:,} candidate pairs from {stats['comparisons']:,} comparisons "
+          f"({stats['keys_filled']:,} donors keyed) in {stats['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m lifelink.dedup [path/to/lifelink.db]
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# lifelink/eligibility.py
+import os
+from datetime import date, timedelta
+
+from lifelink import cache, db, queryplan
+
+# Days a donor must wait after a whole-blood donation before giving again.
+# Override with e.g. LIFELINK_DEFERRAL_DAYS="Male=90,Female=120,Other=90".
+DEFAULT_DEFERRAL = 90
+DEFERRAL_DAYS = {"Male": 90, "Female": 120}
+for _item in filter(None, os.environ.get("LIFELINK_DEFERRAL_DAYS", "").split(",")):
+    _gender, _, _days = _item.partition("=")
+    DEFERRAL_DAYS[_gender.strip()] = int(_days)
+
+# Donors who never donated keep NextEligible = '', which sorts before every date,
+# so "eligible on day X" is a single range on (BloodGroup, NextEligible).
+ELIGIBLE_COLUMNS = "DonorID, Name, Age, Gender, BloodGroup, Contact, LastDonation, NextEligible"
+
+# Pages are keyset on (NextEligible, DonorID) within a group; the first page starts after ('', 0).
+ELIGIBLE_SQL = queryplan.register(
+    "eligible_donors",
+    f"""SELECT {ELIGIBLE_COLUMNS} FROM Donors WHERE BloodGroup = ? AND NextEligible <= ?
+        AND (NextEligible, DonorID) > (?, ?) ORDER BY NextEligible, DonorID LIMIT ?""",
+    ("O+", "2024-01-01", "", 0, 51))
+
+
+def _eligible_in_sql(n):
+    # One ELIGIBLE_SQL range per group, capped and tagged with the group's rank,
+    # so the final LIMIT keeps the best-matching groups rather than index order.
+    arms = " UNION ALL ".join(f"SELECT *, ? AS Rank FROM ({ELIGIBLE_SQL})" for _ in range(n))
+    return f"SELECT {ELIGIBLE_COLUMNS} FROM ({arms}) ORDER BY Rank, NextEligible, DonorID LIMIT ?"
+
+
+# Each arm is the eligible_donors range above; only the few capped rows are sorted.
+queryplan.register("eligible_compatible_donors", _eligible_in_sql(4),
+                   (0, "A+", "2024-01-01", "", 0, 51, 1, "A-", "2024-01-01", "", 0, 51,
+                    2, "O+", "2024-01-01", "", 0, 51, 3, "O-", "2024-01-01", "", 0, 51, 51), allow_scan=True)
+
+
+def deferral(gender):
+    return DEFERRAL_DAYS.get(gender, DEFAULT_DEFERRAL)
+
+
+# ------------------ MAINTENANCE ------------------
+def record_donation(conn, donor_id, day):
+    """Move a donor's LastDonation/NextEligible forward; call in the transaction recording the donation."""
+    row = conn.execute("SELECT Gender, LastDonation FROM Donors WHERE DonorID=?", (donor_id,)).fetchone()
+    if row is None or (row[1] and row[1] >= day):
+        return False
+    next_day = (date.fromisoformat(day) + timedelta(days=deferral(row[0]))).isoformat()
+    conn.execute("UPDATE Donors SET LastDonation=?, NextEligible=? WHERE DonorID=?", (day, next_day, donor_id))
+    return True
+
+
+def rebuild(conn):
+    """Recompute every donor's LastDonation/NextEligible from Transactions."""
+    conn.execute("UPDATE Donors SET LastDonation = NULL, NextEligible = ''")
+    conn.execute("""UPDATE Donors SET LastDonation = t.Last
+                    FROM (SELECT DonorID, MAX(substr(Date, 1, 10)) AS Last FROM Transactions
+                          WHERE Type = 'Donation' AND DonorID IS NOT NULL GROUP BY DonorID) t
+                    WHERE Donors.DonorID = t.DonorID""")
+    for gender, days in DEFERRAL_DAYS.items():
+        conn.execute("UPDATE Donors SET NextEligible = date(LastDonation, ?) WHERE LastDonation IS NOT NULL AND Gender = ?",
+                     (f"+{days} days", gender))
+    placeholders = ", ".join("?" * len(DEFERRAL_DAYS))
+    conn.execute(f"""UPDATE Donors SET NextEligible = date(LastDonation, ?)
+                     WHERE LastDonation IS NOT NULL AND Gender NOT IN ({placeholders})""",
+                 (f"+{DEFAULT_DEFERRAL} days", *DEFERRAL_DAYS))
+
+
+# ------------------ SEARCH ------------------
+@cache.cached("Donors")
+def eligible_donor_page(blood_groups, on, after=None, limit=50):
+    """One page of donors of the given groups who may donate on `on` (ISO date).
+
+    blood_groups is a group or a tuple of groups; rows keep the tuple's
+    order (best match first for compatibility searches), then come the
+    never-donated and longest-eligible donors of each group first.
+    Returns (rows, cursor for the next page or None) like repository.donor_page.
+    """
+    groups = [bg.upper() for bg in ([blood_groups] if isinstance(blood_groups, str) else blood_groups)]
+    start, *key = after or (0, "", 0)
+    if len(groups) - start == 1:
+        rows = db.fetchall(ELIGIBLE_SQL, (groups[start], on, *key, limit + 1))
+    else:
+        params = [p for rank in range(start, len(groups))
+                  for p in (rank, groups[rank], on, *(key if rank == start else ("", 0)), limit + 1)]
+        rows = db.fetchall(_eligible_in_sql(len(groups) - start), (*params, limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (groups.index(last[4]), last[7], last[0])
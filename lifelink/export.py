@@ -0,0 +1,139 @@
+# lifelink/export.py
+import csv
+import io
+import sys
+
+from lifelink import db
+
+CHUNK_ROWS = 5_000
+
+# name: (SQL, column headers, Arrow type names)
+SOURCES = {
+    "donors": (
+        "SELECT DonorID, Name, Age, Gender, BloodGroup, Contact FROM Donors ORDER BY DonorID",
+        ["DonorID", "Name", "Age", "Gender", "BloodGroup", "Contact"],
+        ["int64", "string", "int64", "string", "string", "string"],
+    ),
+    "transactions": (
+        """SELECT TransactionID, DonorID, BloodGroup, Units, Type, Date, Center FROM Transactions
+           WHERE Date >= ? AND Date < ? ORDER BY Date""",
+        ["TransactionID", "DonorID", "BloodGroup", "Units", "Type", "Date", "Center"],
+        ["int64", "int64", "string", "int64", "string", "string", "string"],
+    ),
+    "bookings": (
+        """SELECT BookingID, Username, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt
+           FROM Bookings ORDER BY BookingID""",
+        ["BookingID", "Username", "FullName", "Contact", "BloodGroup", "Center", "BookingDate", "BookingTime",
+         "CreatedAt"],
+        ["int64"] + ["string"] * 8,
+    ),
+}
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def iter_chunks(source, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Yield lists of at most chunk_rows rows straight off the cursor.
+
+    Only transactions take a range (start <= Date < end, ISO strings; open
+    ends allowed). The pooled connection is held until the generator is
+    exhausted or closed; under WAL this does not block writers.
+    """
+    sql, _, _ = SOURCES[source]
+    params = (start or "", end or "9999") if source == "transactions" else ()
+    with db.connection() as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield rows
+
+
+def csv_stream(source, **filters):
+    """Yield the export as UTF-8 CSV bytes, one encoded chunk at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SOURCES[source][1])
+    for rows in iter_chunks(source, **filters):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Sink(io.RawIOBase):
+    # pyarrow writes into this; parquet_stream drains it after every row group.
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def parquet_stream(source, **filters):
+    """Yield the export as Parquet bytes, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _, headers, types = SOURCES[source]
+    schema = pa.schema([(h, pa.type_for_alias(t)) for h, t in zip(headers, types)])
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in iter_chunks(source, **filters):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream(source, fmt, **filters):
+    return (parquet_stream if fmt == "parquet" else csv_stream)(source, **filters)
+
+
+class StreamReader(io.RawIOBase):
+    """Read-only file object over a byte-chunk iterator, for APIs that want a file."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+if __name__ == "__main__":
+    # python -m lifelink.export donors|transactions|bookings OUT.csv|OUT.parquet [db]
+    if len(sys.argv) < 3 or sys.argv[1] not in SOURCES:
+        sys.exit(f"usage: python -m lifelink.export {'|'.join(SOURCES)} OUT.csv|OUT.parquet [db]")
+    if len(sys.argv) > 3:
+        db.configure(sys.argv[3])
+    with open(sys.argv[2], "wb") as out:
+        for part in stream(sys.argv[1], "parquet" if sys.argv[2].endswith(".parquet") else "csv"):
+            out.write(part)
@@ -0,0 +1,136 @@
+# lifelink/forecast.py
+from datetime import date
+
+import numpy as np
+
+from lifelink import cache, db, queryplan
+from lifelink.repository import BLOOD_GROUPS
+
+SEASON = 7  # weekly pattern: drives cluster on weekends, issues on weekdays
+ALPHAS = np.array([0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5])
+GAMMAS = np.array([0.05, 0.1, 0.3])
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600}
+
+INDEX = {bg: i for i, bg in enumerate(BLOOD_GROUPS)}
+
+DAILY_FLOW_SQL = queryplan.register(
+    "daily_net_flow", "SELECT Day, BloodGroup, Donated - Issued FROM DailyStock", allow_scan=True)
+
+
+def daily_net_flow(today=None):
+    """(first day, flow) where flow[t, g] is the net units gained by BLOOD_GROUPS[g] on day t.
+
+    Days without transactions count as zero, up to and including today.
+    """
+    rows = db.fetchall(DAILY_FLOW_SQL)
+    rows = [row for row in rows if row[1] in INDEX]
+    today = np.datetime64(today or date.today(), "D")
+    if not rows:
+        return today, np.zeros((0, len(BLOOD_GROUPS)))
+    days = np.array([row[0] for row in rows], dtype="datetime64[D]")
+    start = days.min()
+    flow = np.zeros(((max(days.max(), today) - start).astype(int) + 1, len(BLOOD_GROUPS)))
+    np.add.at(flow, ((days - start).astype(int), [INDEX[row[1]] for row in rows]),
+              [row[2] for row in rows])
+    return start, flow
+
+
+def fit_models(flow):
+    """Fit additive level + weekly-season exponential smoothing to every group at once.
+
+    Every (alpha, gamma) pair on the grid is run side by side as an extra
+    array axis, and each group keeps the pair with the lowest one-step-ahead
+    squared error. Returns arrays indexed by group, in BLOOD_GROUPS order.
+    """
+    n, groups = flow.shape
+    if n < 2 * SEASON:
+        mean = flow.mean(axis=0) if n else np.zeros(groups)
+        return {
+            "level": mean,
+            "season": np.zeros((SEASON, groups)),
+            "phase": n % SEASON,
+            "sigma": flow.std(axis=0) if n > 1 else np.zeros(groups),
+            "alpha": np.full(groups, np.nan),
+            "gamma": np.full(groups, np.nan),
+            "days": n,
+        }
+
+    alpha, gamma = (a.ravel()[None, :] for a in np.meshgrid(ALPHAS, GAMMAS))   # (1, P)
+    level = np.repeat(flow[:SEASON].mean(axis=0)[:, None], alpha.size, axis=1)  # (G, P)
+    season = np.repeat((flow[:SEASON] - flow[:SEASON].mean(axis=0))[:, :, None], alpha.size, axis=2)
+    sse = np.zeros_like(level)
+    for t in range(SEASON, n):
+        phase = t % SEASON
+        y = flow[t][:, None]
+        err = y - (level + season[phase])
+        sse += err * err
+        level = level + alpha * err
+        season[phase] = gamma * (y - level) + (1 - gamma) * season[phase]
+
+    best = sse.argmin(axis=1)
+    pick = np.arange(groups)
+    return {
+        "level": level[pick, best],
+        "season": season[:, pick, best],
+        "phase": n % SEASON,
+        "sigma": np.sqrt(sse[pick, best] / (n - SEASON)),
+        "alpha": alpha[0, best],
+        "gamma": gamma[0, best],
+        "days": n,
+    }
+
+
+@cache.cached("DailyStock")
+def fitted_models(today=None):
+    """Models for the full history; refitted only after new transactions are recorded."""
+    _, flow = daily_net_flow(today)
+    model = fit_models(flow)
+    for value in model.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False  # shared by every session through the cache
+    return model
+
+
+def _first_day_at_or_below_zero(series):
+    hit = series <= 0
+    return np.where(hit.any(axis=0), hit.argmax(axis=0) + 1, -1)
+
+
+def forecast(stock, horizon=30, confidence=0.9, model=None, today=None):
+    """Project stock per group `horizon` days ahead.
+
+    stock: {blood group: units on hand}. Returns one dict per group with the
+    expected daily net flow, the projected path with its confidence band, and
+    days to stockout (expected / pessimistic / optimistic; 0 if already out,
+    None if beyond the horizon). Without `model`, the models fitted up to
+    `today` (ISO date, part of the cache key) are used.
+    """
+    model = model or fitted_models(today)
+    z = Z_SCORES[confidence]
+    steps = np.arange(1, horizon + 1)
+    phases = (model["phase"] + steps - 1) % SEASON
+    daily = model["level"][None, :] + model["season"][phases]                       # (H, G)
+    current = np.array([stock.get(bg, 0) for bg in BLOOD_GROUPS], dtype=float)
+    expected = current + np.cumsum(daily, axis=0)
+    spread = z * model["sigma"][None, :] * np.sqrt(steps)[:, None]
+    lower, upper = expected - spread, expected + spread
+
+    hits = [_first_day_at_or_below_zero(path) for path in (expected, lower, upper)]
+    results = []
+    for g, bg in enumerate(BLOOD_GROUPS):
+        if current[g] <= 0:
+            expected_day = pessimistic_day = optimistic_day = 0
+        else:
+            expected_day, pessimistic_day, optimistic_day = (int(h[g]) if h[g] > 0 else None for h in hits)
+        results.append({
+            "blood_group": bg,
+            "stock": int(current[g]),
+            "daily_net_flow": float(daily[:, g].mean()),
+            "days_to_stockout": expected_day,
+            "days_to_stockout_low": pessimistic_day,
+            "days_to_stockout_high": optimistic_day,
+            "expected": expected[:, g],
+            "lower": lower[:, g],
+            "upper": upper[:, g],
+        })
+    return results
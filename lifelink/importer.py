@@ -0,0 +1,188 @@
+# lifelink/importer.py
+import csv
+import io
+import re
+import sys
+import time
+from collections import Counter
+
+from lifelink import cache, db, dedup, kpi
+from lifelink.repository import BLOOD_GROUPS, GENDERS
+
+CHUNK_SIZE = 10_000
+MAX_ERRORS = 1_000  # per-row errors kept for the report; the total is always counted
+AGE_RANGE = (18, 65)
+
+# Accepted spellings for each field, lower-cased with spaces and underscores removed.
+COLUMNS = {
+    "name": ("name", "fullname", "donorname"),
+    "age": ("age",),
+    "gender": ("gender", "sex"),
+    "blood_group": ("bloodgroup", "bloodtype", "group", "bg"),
+    "contact": ("contact", "phone", "mobile", "contactnumber"),
+}
+GENDER_ALIASES = {"m": "Male", "male": "Male", "f": "Female", "female": "Female", "o": "Other", "other": "Other"}
+RH_ALIASES = {"+": "+", "pos": "+", "positive": "+", "+ve": "+", "-": "-", "neg": "-", "negative": "-", "-ve": "-"}
+
+INSERT_SQL = """INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact, ContactKey, NameKey)
+                VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []        # (row number, message), first MAX_ERRORS only
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((row_number, message))
+
+
+# ------------------ NORMALIZATION ------------------
+def _key(header):
+    return re.sub(r"[\s_]+", "", str(header or "")).lower()
+
+
+def map_header(header):
+    """Column index for each field; raises ValueError when a required column is missing."""
+    keys = [_key(h) for h in header]
+    mapping = {}
+    for field, aliases in COLUMNS.items():
+        matches = [i for i, k in enumerate(keys) if k in aliases]
+        if not matches:
+            raise ValueError(f"missing column for {field!r} (expected one of {', '.join(aliases)})")
+        mapping[field] = matches[0]
+    return mapping
+
+
+def normalize_blood_group(value):
+    text = re.sub(r"\s+", "", str(value or "")).upper()
+    match = re.fullmatch(r"(AB|A|B|O|0)(\+|-|POS|NEG|POSITIVE|NEGATIVE|\+VE|-VE)", text)
+    if not match:
+        return None
+    abo = "O" if match.group(1) == "0" else match.group(1)
+    group = abo + RH_ALIASES[match.group(2).lower()]
+    return group if group in BLOOD_GROUPS else None
+
+
+def normalize(row, mapping):
+    """(Name, Age, Gender, BloodGroup, Contact) ready to insert, or raise ValueError."""
+    def field(name):
+        i = mapping[name]
+        value = row[i] if i < len(row) else None
+        return "" if value is None else str(value).strip()
+
+    name = " ".join(field("name").split())
+    if not name:
+        raise ValueError("name is empty")
+    try:
+        age = int(float(field("age")))
+    except ValueError:
+        raise ValueError(f"age {field('age')!r} is not a number") from None
+    if not AGE_RANGE[0] <= age <= AGE_RANGE[1]:
+        raise ValueError(f"age {age} outside {AGE_RANGE[0]}-{AGE_RANGE[1]}")
+    gender = GENDER_ALIASES.get(field("gender").lower())
+    if gender not in GENDERS:
+        raise ValueError(f"gender {field('gender')!r} not one of {', '.join(GENDERS)}")
+    blood_group = normalize_blood_group(field("blood_group"))
+    if blood_group is None:
+        raise ValueError(f"blood group {field('blood_group')!r} not one of {', '.join(BLOOD_GROUPS)}")
+    contact = re.sub(r"[\s().-]", "", field("contact"))
+    if not re.fullmatch(r"\+?\d{6,15}", contact):
+        raise ValueError(f"contact {field('contact')!r} is not a phone number")
+    return name, age, gender, blood_group, contact
+
+
+# ------------------ READERS ------------------
+def read_rows(file, filename):
+    """Yield raw rows (header first) from a CSV or XLSX file without loading it whole."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Excel import needs openpyxl (pip install openpyxl)") from None
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        text = file if isinstance(file, io.TextIOBase) else io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        yield from csv.reader(text)
+
+
+# ------------------ PIPELINE ------------------
+def import_donors(file, filename, progress=None, chunk_size=CHUNK_SIZE):
+    """Validate and insert donors chunk by chunk; memory use is bounded by chunk_size.
+
+    Each chunk is inserted with executemany in its own transaction, so a
+    failure part-way keeps the chunks already committed. `progress`, if
+    given, is called with the report after every chunk. Invalid rows are
+    skipped and listed in report.errors with their 1-based line number.
+    """
+    report = ImportReport()
+    rows = read_rows(file, filename)
+    mapping = map_header(next(rows, None) or [])
+
+    def flush(batch):
+        if batch:
+            db.retry_busy(lambda: _insert(batch))
+            report.inserted += len(batch)
+        report.elapsed = time.perf_counter() - report.started
+        if progress:
+            progress(report)
+
+    batch = []
+    for line, row in enumerate(rows, start=2):
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        report.rows_read += 1
+        try:
+            batch.append(normalize(row, mapping))
+        except ValueError as exc:
+            report.error(line, str(exc))
+        if report.rows_read % chunk_size == 0:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return report
+
+
+def _insert(batch):
+    # Each imported donor is checked against the registry (and the rest of the file) as it lands.
+    with db.transaction(immediate=True) as conn:
+        last = conn.execute("SELECT COALESCE(MAX(DonorID), 0) FROM Donors").fetchone()[0]
+        conn.executemany(INSERT_SQL, [row + dedup.keys(row[0], row[3], row[4]) for row in batch])
+        for (donor_id,) in conn.execute("SELECT DonorID FROM Donors WHERE DonorID > ?", (last,)).fetchall():
+            dedup.check(conn, donor_id)
+        for blood_group, count in Counter(row[3] for row in batch).items():
+            kpi.add(conn, kpi.DONORS, blood_group, count)
+        cache.record(conn, "Donors", "DuplicateCandidates", "KpiSnapshot")
+
+
+if __name__ == "__main__":
+    # python -m lifelink.importer donors.csv [path/to/lifelink.db]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m lifelink.importer FILE.csv|FILE.xlsx [db]")
+    from lifelink import importer, migrations
+
+    if len(sys.argv) > 2:
+        db.configure(sys.argv[2])
+    migrations.ensure_schema()
+    with open(sys.argv[1], "rb") as f:
+        result = importer.import_donors(
+            f, sys.argv[1],
+            progress=lambda r: print(f"\r{r.rows_read:,} rows · {r.inserted:,} inserted · "
+                                     f"{r.error_count:,} errors · {r.throughput:,.0f} rows/s", end=""))
+    print()
+    for line, message in result.errors[:20]:
+        print(f"  line {line}: {message}")
@@ -0,0 +1,185 @@
+# lifelink/insights.py
+import abc
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from lifelink import perf
+from lifelink.kpi import LOW_STOCK
+
+CACHE_TTL = 15 * 60  # seconds
+MAX_WORKERS = 2
+
+PROMPT_TEMPLATE = """
+You are an AI healthcare analyst.
+Below is the current blood stock data (units on hand per blood group).
+
+{stock}
+
+1. Identify blood groups at risk
+2. Predict shortages
+3. Give clear, actionable advice for hospital admins
+"""
+
+
+# ------------------ BACKENDS ------------------
+class Backend(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, prompt):
+        """The whole answer to `prompt` as one string."""
+
+    def stream(self, prompt):
+        # Backends without native streaming deliver the answer in one chunk.
+        yield self.generate(prompt)
+
+
+class GeminiBackend(Backend):
+    name = "gemini"
+
+    def __init__(self, api_key, model_name="gemini-pro"):
+        import google.generativeai as genai  # heavy; only paid once AI Insights is opened
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class StubBackend(Backend):
+    """Deterministic offline backend: the same prompt always yields the same answer."""
+    name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt):
+        stock = {abo + rh: int(units) for abo, rh, units in re.findall(r"^(AB|A|B|O)([+-]): (-?\d+)$", prompt, re.M)}
+        low = sorted((units, bg) for bg, units in stock.items() if units < LOW_STOCK)
+        parts = ["**Offline stock analysis**\n\n"]
+        if low:
+            parts.append("Groups at risk: " + ", ".join(f"{bg} ({units} units)" for units, bg in low) + ".\n\n")
+            parts.append(f"Schedule donor outreach for {low[0][1]} first and review issue requests "
+                         "against compatible substitutes.\n")
+        else:
+            parts.append(f"All {len(stock)} groups hold at least {LOW_STOCK} units; no immediate shortage.\n")
+        for part in parts:
+            if self.latency:
+                time.sleep(self.latency / len(parts))
+            yield part
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(kind, api_key=None):
+    """Process-wide backend instance, created on first use ("gemini" or "stub")."""
+    with _backends_lock:
+        if kind not in _backends:
+            _backends[kind] = GeminiBackend(api_key) if kind == "gemini" else StubBackend()
+        return _backends[kind]
+
+
+# ------------------ JOBS ------------------
+class InsightJob:
+    """A generation running (or finished) in the background; reruns poll it instead of blocking."""
+
+    def __init__(self, key):
+        self.key = key
+        self.chunks = []
+        self.future = Future()
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lifelink-ai")
+_lock = threading.Lock()
+_jobs = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def render_prompt(stock, template=PROMPT_TEMPLATE):
+    return template.format(stock="\n".join(f"{bg}: {units}" for bg, units in sorted(stock)))
+
+
+def cache_key(stock, template, backend):
+    payload = repr((backend.name, template, sorted(stock)))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _run(job, backend, prompt):
+    try:
+        with perf.span("insights.generate", "ai"):
+            for chunk in backend.stream(prompt):
+                job.chunks.append(chunk)
+    except Exception as exc:
+        with _lock:
+            # Failures are not cached; the next request retries.
+            if _jobs.get(job.key) is job:
+                del _jobs[job.key]
+        job.finished = time.monotonic()
+        job.future.set_exception(exc)
+    else:
+        job.finished = time.monotonic()
+        job.future.set_result(job.text)
+
+
+def _fresh(job, ttl):
+    # Called with _lock held; jobs still running are never stale.
+    return job is not None and not (job.done() and time.monotonic() - job.finished > ttl)
+
+
+def request_insights(stock, backend, template=PROMPT_TEMPLATE, ttl=CACHE_TTL):
+    """Return the job answering `template` for this stock snapshot.
+
+    A fresh cached answer comes back as an already-finished job; a request
+    identical to one still in flight (another admin session, or a rerun)
+    shares that job instead of calling the backend again.
+    """
+    key = cache_key(stock, template, backend)
+    with _lock:
+        job = _jobs.get(key)
+        if _fresh(job, ttl):
+            _stats["hits" if job.done() else "coalesced"] += 1
+            return job
+        _stats["misses"] += 1
+        now = time.monotonic()
+        for stale in [k for k, j in _jobs.items() if j.done() and now - j.finished > ttl]:
+            del _jobs[stale]
+        job = _jobs[key] = InsightJob(key)
+    _executor.submit(_run, job, backend, render_prompt(stock, template))
+    return job
+
+
+def peek(stock, backend, template=PROMPT_TEMPLATE, ttl=CACHE_TTL):
+    """The job for this snapshot if one exists and has not expired, without starting a new one."""
+    with _lock:
+        job = _jobs.get(cache_key(stock, template, backend))
+        return job if _fresh(job, ttl) else None
+
+
+def stats():
+    with _lock:
+        return dict(_stats, entries=len(_jobs))
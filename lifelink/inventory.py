@@ -0,0 +1,139 @@
+# lifelink/inventory.py
+from datetime import date, timedelta
+
+from lifelink import cache, db, queryplan, slots
+
+# Days a unit stays usable after collection, per component.
+SHELF_LIFE = {"Whole Blood": 35, "Red Cells": 42, "Platelets": 5, "Plasma": 365}
+DEFAULT_COMPONENT = "Whole Blood"
+
+# Lots that still hold units are the only ones FIFO and the expiry report look at;
+# the partial index keeps them small however many depleted lots pile up.
+FIFO_SQL = queryplan.register(
+    "fifo_lots",
+    """SELECT LotID, Remaining FROM Lots
+       WHERE BloodGroup = ? AND Center = ? AND Remaining > 0 AND Expiry >= ? ORDER BY Expiry, LotID LIMIT ?""",
+    ("O+", "Central Hospital", "2024-01-01", 5))
+
+
+def _expiring_sql(groups, centers):
+    return (f"""SELECT Center, BloodGroup, Expiry, SUM(Remaining) FROM Lots
+                WHERE BloodGroup IN ({', '.join('?' * groups)}) AND Center IN ({', '.join('?' * centers)})
+                  AND Remaining > 0 AND Expiry <= ?
+                GROUP BY BloodGroup, Center, Expiry""")
+
+
+def expiry(collected, component=DEFAULT_COMPONENT):
+    """Last usable day (ISO) of a unit collected on `collected` (ISO)."""
+    return (date.fromisoformat(collected) + timedelta(days=SHELF_LIFE[component])).isoformat()
+
+
+# ------------------ MAINTENANCE ------------------
+def add_lot(conn, blood_group, units, collected, component=DEFAULT_COMPONENT, donor_id=None, transaction_id=None,
+            remaining=None, center=slots.HOME_CENTER):
+    conn.execute("""INSERT INTO Lots (TransactionID, DonorID, BloodGroup, Center, Component, Collected, Expiry,
+                                      Quantity, Remaining)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                 (transaction_id, donor_id, blood_group, center, component, collected, expiry(collected, component),
+                  units, units if remaining is None else remaining))
+
+
+def _take(conn, blood_group, units, day, center):
+    # Yields (lot, units taken) soonest expiry first, after taking them; stops once `units` are covered.
+    needed = units
+    for lot_id, remaining in conn.execute(FIFO_SQL, (blood_group, center, day, units)).fetchall():
+        take = min(remaining, needed)
+        conn.execute("UPDATE Lots SET Remaining = Remaining - ? WHERE LotID = ?", (take, lot_id))
+        yield lot_id, take
+        needed -= take
+        if not needed:
+            break
+
+
+def allocate(conn, blood_group, units, day, transaction_id, center=slots.HOME_CENTER):
+    """Take `units` from the center's unexpired lots of a group, soonest expiry first; returns units still missing.
+
+    Call inside the issuing transaction: the caller rolls back when anything is missing.
+    """
+    taken = 0
+    for lot_id, take in _take(conn, blood_group, units, day, center):
+        conn.execute("INSERT INTO LotIssues (TransactionID, LotID, Units) VALUES (?, ?, ?)",
+                     (transaction_id, lot_id, take))
+        taken += take
+    return units - taken
+
+
+def move(conn, blood_group, units, day, from_center, to_center):
+    """Split `units` off the source center's lots (FIFO) into new lots at the destination; returns units missing.
+
+    The new lots keep the donation, donor, component and expiry of the ones they came from.
+    """
+    taken = 0
+    for lot_id, take in _take(conn, blood_group, units, day, from_center):
+        conn.execute("""INSERT INTO Lots (TransactionID, DonorID, BloodGroup, Center, Component, Collected, Expiry,
+                                          Quantity, Remaining)
+                        SELECT TransactionID, DonorID, BloodGroup, ?, Component, Collected, Expiry, ?, ?
+                        FROM Lots WHERE LotID = ?""", (to_center, take, take, lot_id))
+        taken += take
+    return units - taken
+
+
+def expire(conn, day, blood_group=None, center=None):
+    """Empty every lot whose expiry is before `day`; returns {(center, blood group): units written off}."""
+    where = "Remaining > 0 AND Expiry < ?"
+    params = [day]
+    if blood_group:
+        where += " AND BloodGroup = ?"
+        params.append(blood_group)
+    if center:
+        where += " AND Center = ?"
+        params.append(center)
+    rows = conn.execute(f"SELECT Center, BloodGroup, SUM(Remaining) FROM Lots WHERE {where} GROUP BY Center, BloodGroup",
+                        params).fetchall()
+    if rows:
+        conn.execute(f"UPDATE Lots SET Remaining = 0 WHERE {where}", params)
+    return {(c, bg): units for c, bg, units in rows}
+
+
+def rebuild(conn, today=None):
+    """Recreate lots for what each center holds now from its most recent donations.
+
+    Issues were FIFO, so the units still on the shelf are the newest ones;
+    units a center holds beyond its recorded donations (transfers in, or
+    stock from before lots existed) become one opening lot collected today.
+    """
+    today = today or date.today().isoformat()
+    conn.execute("DELETE FROM LotIssues")
+    conn.execute("DELETE FROM Lots")
+    for center, blood_group, held in conn.execute("SELECT Center, BloodGroup, Units FROM CenterStock").fetchall():
+        needed = held
+        donations = conn.execute("""SELECT TransactionID, DonorID, Date, Units FROM Transactions
+                                    WHERE BloodGroup = ? AND Type = 'Donation' AND Center = ?
+                                    ORDER BY Date DESC, TransactionID DESC""", (blood_group, center))
+        for transaction_id, donor_id, collected, units in donations:
+            if needed <= 0:
+                break
+            take = min(units, needed)
+            add_lot(conn, blood_group, units, collected[:10], donor_id=donor_id, transaction_id=transaction_id,
+                    remaining=take, center=center)
+            needed -= take
+        if needed > 0:
+            add_lot(conn, blood_group, needed, today, center=center)
+
+
+# ------------------ REPORTS ------------------
+@cache.cached("Lots")
+def expiring_soon(blood_groups, centers, today, days=7):
+    """Units still on the shelf that expire within `days` of `today` (or already have).
+
+    Returns (center, blood group, expiry day, units) rows, read from the
+    partial (BloodGroup, Center, Expiry) index only: one range per group
+    and center, however many depleted lots there are.
+    """
+    until = (date.fromisoformat(today) + timedelta(days=days)).isoformat()
+    return db.fetchall(_expiring_sql(len(blood_groups), len(centers)), (*blood_groups, *centers, until))
+
+
+queryplan.register("expiring_soon", _expiring_sql(8, 4),
+                   ("A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-",
+                    "City Hall", "Community Center", "Central Hospital", "Mobile Unit", "2024-01-08"))
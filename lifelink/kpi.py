@@ -0,0 +1,124 @@
+# lifelink/kpi.py
+import argparse
+import sys
+from datetime import date, timedelta
+
+from lifelink import cache, db, queryplan
+
+# Counters behind the Admin Dashboard. Every write path moves them in the same
+# transaction as the rows they count, so the dashboard never aggregates the big tables.
+DONORS = "Donors"       # Scope = blood group, no Day
+BOOKINGS = "Bookings"   # Scope = center, Day = booking date
+MOVEMENTS = ("Donation", "Issue", "Expired")   # Day = movement date, units summed over every group and center
+
+LOW_STOCK = 5           # a group below this many units network-wide is flagged, on every page and in AI Insights
+WINDOWS = {"today": 1, "week": 7, "month": 30}
+BOOKING_DAYS = 7        # upcoming bookings are counted this many days ahead, today included
+
+UPSERT_SQL = """INSERT INTO KpiSnapshot (Metric, Day, Scope, Value) VALUES (?, ?, ?, ?)
+                ON CONFLICT (Metric, Day, Scope) DO UPDATE SET Value = Value + excluded.Value"""
+
+# What the snapshot should hold, recounted from the source tables.
+SOURCE_SQL = f"""SELECT '{DONORS}', '', BloodGroup, COUNT(*) FROM Donors GROUP BY BloodGroup
+                 UNION ALL
+                 SELECT Type, substr(Date, 1, 10), '', SUM(Units) FROM Transactions GROUP BY Type, substr(Date, 1, 10)
+                 UNION ALL
+                 SELECT '{BOOKINGS}', BookingDate, Center, COUNT(*) FROM Bookings GROUP BY BookingDate, Center"""
+
+# One small read: the donor counters, the last month of movements and the coming week
+# of bookings, each a range of the primary key, plus Stock (one row per group, so scanned).
+SNAPSHOT_SQL = queryplan.register(
+    "kpi_snapshot",
+    f"""SELECT Metric, Day, Scope, Value FROM KpiSnapshot WHERE Metric = '{DONORS}'
+        UNION ALL
+        SELECT Metric, Day, Scope, Value FROM KpiSnapshot
+        WHERE Metric IN ({', '.join(f"'{m}'" for m in MOVEMENTS)}) AND Day >= ? AND Day <= ?
+        UNION ALL
+        SELECT Metric, Day, Scope, Value FROM KpiSnapshot WHERE Metric = '{BOOKINGS}' AND Day >= ? AND Day <= ?
+        UNION ALL
+        SELECT 'Stock', '', BloodGroup, Units FROM Stock""",
+    ("2024-01-01", "2024-01-30", "2024-01-30", "2024-02-05"), allow_scan=True)
+
+
+# ------------------ MAINTENANCE ------------------
+def add(conn, metric, scope, delta, day=""):
+    """Move one counter by `delta`; call inside the transaction that made the change."""
+    conn.execute(UPSERT_SQL, (metric, day, scope, delta))
+
+
+def record_movement(conn, t_type, units, day):
+    add(conn, t_type, "", units, day)
+
+
+def count_donor(conn, old_group, new_group):
+    """A donor left `old_group` and joined `new_group`; either is None for an insert or a delete."""
+    if old_group == new_group:
+        return
+    if old_group:
+        add(conn, DONORS, old_group, -1)
+    if new_group:
+        add(conn, DONORS, new_group, 1)
+
+
+def rebuild(conn=None):
+    """Recount every KPI from Donors, Transactions and Bookings; returns the number of counters."""
+    if conn is None:
+        with db.transaction(immediate=True) as conn:
+            rows = rebuild(conn)
+            cache.record(conn, "KpiSnapshot")
+        return rows
+    conn.execute("DELETE FROM KpiSnapshot")
+    return conn.execute(f"INSERT INTO KpiSnapshot (Metric, Day, Scope, Value) {SOURCE_SQL}").rowcount
+
+
+# ------------------ DASHBOARD ------------------
+@cache.cached("KpiSnapshot", "Stock")
+def snapshot(today):
+    """Dashboard figures as of `today` (ISO), from a few hundred rows at most.
+
+    Returns a dict: donors and stock per group, low_stock groups, Donation/
+    Issue/Expired units over each of WINDOWS, and upcoming bookings per center.
+    """
+    today = date.fromisoformat(today)
+    month_start = (today - timedelta(days=max(WINDOWS.values()) - 1)).isoformat()
+    until = (today + timedelta(days=BOOKING_DAYS - 1)).isoformat()
+    starts = {name: (today - timedelta(days=days - 1)).isoformat() for name, days in WINDOWS.items()}
+
+    result = {"donors": {}, "stock": {}, "bookings": {}, "bookings_today": {},
+              "movements": {t: dict.fromkeys(WINDOWS, 0) for t in MOVEMENTS}}
+    for metric, day, scope, value in db.fetchall(SNAPSHOT_SQL, (month_start, today.isoformat(),
+                                                                today.isoformat(), until)):
+        if metric == DONORS:
+            if value:
+                result["donors"][scope] = value
+        elif metric == "Stock":
+            result["stock"][scope] = value
+        elif metric == BOOKINGS:
+            result["bookings"][scope] = result["bookings"].get(scope, 0) + value
+            if day == today.isoformat():
+                result["bookings_today"][scope] = result["bookings_today"].get(scope, 0) + value
+        else:
+            for name, start in starts.items():
+                if day >= start:
+                    result["movements"][metric][name] += value
+    result["low_stock"] = sorted(bg for bg, units in result["stock"].items() if units < LOW_STOCK)
+    return result
+
+
+# ------------------ CLI ------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recount the Admin Dashboard KPIs from the source tables.")
+    parser.add_argument("db", nargs="?", help="database file (default: LIFELINK_DB or lifelink.db)")
+    args = parser.parse_args(argv)
+
+    from lifelink import migrations
+    if args.db:
+        db.configure(args.db)
+    migrations.ensure_schema()
+    print(f"{rebuild():,} KPI counters recounted")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m lifelink.kpi [path/to/lifelink.db]
+    sys.exit(main())
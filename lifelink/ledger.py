@@ -0,0 +1,192 @@
+# lifelink/ledger.py
+from collections import namedtuple
+from datetime import datetime
+
+from lifelink import eligibility, inventory, kpi, slots, trend, writer
+
+TRANSACTION_TYPES = ("Donation", "Issue")
+EXPIRED = "Expired"   # written off by the ledger itself, never entered by hand
+
+Movement = namedtuple("Movement", "blood_group units t_type donor_id component center",
+                      defaults=(None, inventory.DEFAULT_COMPONENT, slots.HOME_CENTER))
+
+# Stock is the network-wide total per group and CenterStock the per-center one;
+# every movement updates both in the same transaction, so neither is ever re-summed.
+CENTER_STOCK_UPSERT = """INSERT INTO CenterStock (Center, BloodGroup, Units) VALUES (?, ?, ?)
+                         ON CONFLICT (Center, BloodGroup) DO UPDATE SET Units = Units + excluded.Units"""
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+class UnknownBloodGroup(ValueError):
+    pass
+
+
+class UnknownCenter(ValueError):
+    pass
+
+
+def _check_center(center):
+    if center not in slots.CENTERS:
+        raise UnknownCenter(center)
+
+
+def _check_units(units):
+    if int(units) != units or units <= 0:
+        raise ValueError(f"units must be a positive whole number, got {units!r}")
+    return int(units)
+
+
+def _validate(movement):
+    if movement.t_type not in TRANSACTION_TYPES:
+        raise ValueError(f"unknown transaction type: {movement.t_type!r}")
+    units = _check_units(movement.units)
+    if movement.component not in inventory.SHELF_LIFE:
+        raise ValueError(f"unknown component: {movement.component!r}")
+    _check_center(movement.center)
+    return movement._replace(blood_group=movement.blood_group.upper(), units=units)
+
+
+def _write_off(conn, expired, now):
+    for (center, blood_group), units in expired.items():
+        conn.execute("UPDATE CenterStock SET Units = Units - ? WHERE Center=? AND BloodGroup=?",
+                     (units, center, blood_group))
+        conn.execute("UPDATE Stock SET Units = Units - ? WHERE BloodGroup=?", (units, blood_group))
+        conn.execute("""INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date, Center)
+                        VALUES (NULL, ?, ?, ?, ?, ?)""", (blood_group, units, EXPIRED, now, center))
+        trend.record(conn, blood_group, EXPIRED, units, now[:10])
+        kpi.record_movement(conn, EXPIRED, units, now[:10])
+
+
+def _submit_write_off(places):
+    """Queue the write-off of expired units at these (blood group, center) places as a mutation of its own.
+
+    It is queued just before the movement that needs it, so the expired units
+    leave Stock even when that movement then fails (say InsufficientStock).
+    """
+    def run(conn):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for blood_group, center in places:
+            _write_off(conn, inventory.expire(conn, now[:10], blood_group, center), now)
+
+    return writer.submit(run, "Stock", "CenterStock", "Transactions", "DailyStock", "Lots", "KpiSnapshot")
+
+
+def _take_from_center(conn, center, blood_group, units):
+    # The stock check is part of the UPDATE itself, so two concurrent issues
+    # can never both see the same units and drive a center negative.
+    cur = conn.execute("UPDATE CenterStock SET Units = Units - ? WHERE Center=? AND BloodGroup=? AND Units >= ?",
+                       (units, center, blood_group, units))
+    if cur.rowcount == 0:
+        if conn.execute("SELECT 1 FROM Stock WHERE BloodGroup=?", (blood_group,)).fetchone():
+            raise InsufficientStock(blood_group)
+        raise UnknownBloodGroup(blood_group)
+
+
+def _apply(conn, movement, now):
+    day = now[:10]
+    if movement.t_type == "Issue":
+        # submit_batch() already wrote off expired units; this only catches lots
+        # that expired since (the date turned over in between).
+        _write_off(conn, inventory.expire(conn, day, movement.blood_group, movement.center), now)
+        _take_from_center(conn, movement.center, movement.blood_group, movement.units)
+        conn.execute("UPDATE Stock SET Units = Units - ? WHERE BloodGroup=?", (movement.units, movement.blood_group))
+    else:
+        cur = conn.execute("UPDATE Stock SET Units = Units + ? WHERE BloodGroup=?",
+                           (movement.units, movement.blood_group))
+        if cur.rowcount == 0:
+            raise UnknownBloodGroup(movement.blood_group)
+        conn.execute(CENTER_STOCK_UPSERT, (movement.center, movement.blood_group, movement.units))
+    cur = conn.execute("""INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date, Center)
+                          VALUES (?, ?, ?, ?, ?, ?)""",
+                       (movement.donor_id, movement.blood_group, movement.units, movement.t_type, now,
+                        movement.center))
+    if movement.t_type == "Issue":
+        # Stock is the sum of the lots, so this only trips if the two have drifted apart.
+        if inventory.allocate(conn, movement.blood_group, movement.units, day, cur.lastrowid, movement.center):
+            raise InsufficientStock(movement.blood_group)
+    else:
+        inventory.add_lot(conn, movement.blood_group, movement.units, day, movement.component, movement.donor_id,
+                          cur.lastrowid, center=movement.center)
+    trend.record(conn, movement.blood_group, movement.t_type, movement.units, day)
+    kpi.record_movement(conn, movement.t_type, movement.units, day)
+    if movement.t_type == "Donation" and movement.donor_id:
+        eligibility.record_donation(conn, movement.donor_id, day)
+
+
+def submit_batch(movements):
+    """Queue movements on the writer as one atomic mutation; returns a Future.
+
+    Either every movement is recorded or none is: the future raises
+    InsufficientStock if any Issue would overdraw its group at its center,
+    and none of them is written in that case (units already past their
+    expiry are still written off). Invalid movements raise here, before
+    queueing. Issues take units from the soonest-expiring lots first.
+    """
+    movements = [_validate(Movement(*m)) for m in movements]
+    issued_from = sorted({(m.blood_group, m.center) for m in movements if m.t_type == "Issue"})
+    if issued_from:
+        _submit_write_off(issued_from)
+
+    def run(conn):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for movement in movements:
+            _apply(conn, movement, now)
+        return len(movements)
+
+    tables = ["Stock", "CenterStock", "Transactions", "DailyStock", "Lots", "KpiSnapshot"]
+    if any(m.t_type == "Donation" and m.donor_id for m in movements):
+        tables.append("Donors")
+    return writer.submit(run, *tables)
+
+
+def apply_batch(movements):
+    """submit_batch() and wait for the commit; returns the number of movements recorded."""
+    if not movements:
+        return 0
+    return writer.wait(submit_batch(movements), "ledger.apply_batch")
+
+
+def record(blood_group, units, t_type, donor_id=None, component=inventory.DEFAULT_COMPONENT,
+           center=slots.HOME_CENTER):
+    apply_batch([Movement(blood_group, units, t_type, donor_id, component, center)])
+
+
+def transfer(blood_group, units, from_center, to_center):
+    """Move units of a group between centers as one atomic write; returns the TransferID.
+
+    The soonest-expiring units go, keeping their expiry. Network totals do
+    not change. Raises InsufficientStock when the source center is short.
+    """
+    blood_group, units = blood_group.upper(), _check_units(units)
+    _check_center(from_center)
+    _check_center(to_center)
+    if from_center == to_center:
+        raise ValueError("a transfer needs two different centers")
+    _submit_write_off([(blood_group, from_center)])
+
+    def run(conn):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _write_off(conn, inventory.expire(conn, now[:10], blood_group, from_center), now)
+        _take_from_center(conn, from_center, blood_group, units)
+        conn.execute(CENTER_STOCK_UPSERT, (to_center, blood_group, units))
+        if inventory.move(conn, blood_group, units, now[:10], from_center, to_center):
+            raise InsufficientStock(blood_group)
+        cur = conn.execute("""INSERT INTO Transfers (BloodGroup, Units, FromCenter, ToCenter, Date)
+                              VALUES (?, ?, ?, ?, ?)""", (blood_group, units, from_center, to_center, now))
+        return cur.lastrowid
+
+    return writer.write(run, "Stock", "CenterStock", "Transactions", "DailyStock", "Lots", "Transfers", "KpiSnapshot")
+
+
+def expire_due():
+    """Write off every unit past its expiry now; returns {(center, blood group): units written off}."""
+    def run(conn):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        expired = inventory.expire(conn, now[:10])
+        _write_off(conn, expired, now)
+        return expired
+
+    return writer.write(run, "Stock", "CenterStock", "Transactions", "DailyStock", "Lots", "KpiSnapshot")
@@ -0,0 +1,326 @@
+# lifelink/loadtest.py
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+from lifelink import kpi
+from lifelink.repository import BLOOD_GROUPS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "loadtest"
+TIMEOUT = 60          # seconds one rerun may take before AppTest gives up
+OPENING_STOCK = 40    # units per group donated before the run, so issues can succeed
+
+JOURNEYS = {}
+
+
+def journey(name):
+    """Register fn(session, rng) as a scripted user journey."""
+    def register(fn):
+        JOURNEYS[name] = fn
+        return fn
+    return register
+
+
+# ------------------ SESSIONS ------------------
+class Session:
+    """One headless browser tab: an AppTest of admin.py or user.py plus what its reruns cost."""
+
+    def __init__(self, script, stats):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(BASE_DIR / script), default_timeout=TIMEOUT)
+        self.stats = stats
+
+    def step(self, name, widget=None):
+        """Rerun the script (after interacting with `widget`, if given) and record the rerun."""
+        started = time.perf_counter()
+        try:
+            (widget or self.at).run()
+        except Exception as exc:   # AppTest timeouts and the like
+            self.stats.failed(name, exc)
+            return False
+        self.stats.latencies[name].append(time.perf_counter() - started)
+        for exc in self.at.exception:
+            self.stats.failed(name, exc.message)
+        for error in self.at.error:
+            self.stats.outcomes[f"{name}: {error.value}"] += 1
+        return not self.at.exception
+
+    def find(self, kind, label, sidebar=False):
+        root = self.at.sidebar if sidebar else self.at
+        for widget in getattr(root, kind):
+            if widget.label == label:
+                return widget
+        raise LookupError(f"no {kind} labelled {label!r} on this page")
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)   # step -> seconds per rerun
+        self.outcomes = Counter()            # errors the app showed to the user (st.error)
+        self.exceptions = Counter()          # uncaught, grouped as busy / other message
+
+    def failed(self, step, exc):
+        message = str(exc) or type(exc).__name__
+        kind = "busy" if "locked" in message or "busy" in message.lower() else message.splitlines()[0][:120]
+        self.exceptions[f"{step}: {kind}"] += 1
+
+    def as_dict(self):
+        return {"latencies": dict(self.latencies), "outcomes": dict(self.outcomes),
+                "exceptions": dict(self.exceptions)}
+
+
+def _login(session, username):
+    session.step("open")
+    session.find("selectbox", "Menu", sidebar=True).set_value("Login")
+    session.step("login page")
+    session.find("text_input", "Username").input(username)
+    session.find("text_input", "Password").input(PASSWORD)
+    session.step("login", session.find("button", "Login").click())
+
+
+# ------------------ JOURNEYS ------------------
+@journey("donor_desk")
+def _donor_desk(session, rng, username, rounds):
+    """Staff in admin.py: record a donation, then issue blood, `rounds` times."""
+    _login(session, username)
+    for _ in range(rounds):
+        bg = rng.choice(BLOOD_GROUPS)
+        session.find("radio", "Menu", sidebar=True).set_value("Record Donation")
+        session.step("record donation page")
+        session.find("selectbox", "Blood Group").set_value(bg)
+        session.find("number_input", "Units").set_value(rng.randint(1, 3))
+        session.step("record donation", session.find("button", "Record Donation").click())
+
+        session.find("radio", "Menu", sidebar=True).set_value("Issue Blood")
+        session.step("issue blood page")
+        session.find("selectbox", "Blood Group").set_value(rng.choice(BLOOD_GROUPS))
+        session.find("number_input", "Units").set_value(rng.randint(1, 4))
+        session.step("issue blood", session.find("button", "Issue Blood").click())
+
+
+@journey("booker")
+def _booker(session, rng, username, rounds):
+    """A donor in user.py booking slots over the next two weeks, `rounds` times."""
+    from lifelink import slots
+
+    _login(session, username)
+    session.at.selectbox(key="guidance_dropdown").set_value("Book Donation Slot")
+    session.step("booking page")
+    for _ in range(rounds):
+        session.find("selectbox", "Donation Center").set_value(rng.choice(slots.CENTERS))
+        session.find("date_input", "Booking Date").set_value(date.today() + timedelta(days=rng.randint(0, 13)))
+        session.step("pick slot")
+        book = session.find("button", "Book Slot")
+        if book.disabled:
+            session.stats.outcomes["pick slot: no open slots"] += 1
+            continue
+        session.step("book slot", book.click())
+
+
+# ------------------ WORKERS ------------------
+def _worker(path, name, index, rounds, seed, barrier, results):
+    os.environ["LIFELINK_DB"] = path
+    from lifelink import db
+
+    db.configure(path)
+    stats = Stats()
+    rng = random.Random(seed * 1_000_003 + index)
+    script = "admin.py" if name == "donor_desk" else "user.py"
+    session = Session(script, stats)
+    barrier.wait()
+    try:
+        JOURNEYS[name](session, rng, f"load{index}", rounds)
+    except Exception as exc:   # a journey that cannot continue still reports what it measured
+        stats.failed("journey", exc)
+    results.put(stats.as_dict())
+
+
+def prepare(path, sessions):
+    """Create the schema, one login per session and some opening stock."""
+    from lifelink import db, ledger, migrations, repository as repo
+
+    db.configure(path)
+    migrations.reset()
+    migrations.ensure_schema()
+    for i in range(sessions):
+        repo.create_user(f"load{i}", PASSWORD, f"Load Tester {i}", 30, "Other", "9000000000")
+    existing = dict(repo.view_stock.uncached())
+    ledger.apply_batch([(bg, OPENING_STOCK, "Donation") for bg in repo.BLOOD_GROUPS
+                             if existing.get(bg, 0) < OPENING_STOCK])
+
+
+def check_invariants(path):
+    """Consistency checks after a run; returns a list of violations (empty when all hold)."""
+    conn = sqlite3.connect(path)
+    try:
+        problems = []
+        for bg, units, net in conn.execute(
+                """SELECT s.BloodGroup, s.Units,
+                          COALESCE((SELECT SUM(CASE WHEN t.Type='Donation' THEN t.Units ELSE -t.Units END)
+                                    FROM Transactions t WHERE t.BloodGroup = s.BloodGroup), 0)
+                   FROM Stock s"""):
+            if units != net:
+                problems.append(f"Stock {bg} = {units} but transactions sum to {net}")
+            if units < 0:
+                problems.append(f"Stock {bg} is negative ({units})")
+        for bg, closing, units in conn.execute(
+                """SELECT d.BloodGroup, d.Closing, s.Units FROM DailyStock d JOIN Stock s USING (BloodGroup)
+                   WHERE d.Day = (SELECT MAX(Day) FROM DailyStock WHERE BloodGroup = d.BloodGroup)"""):
+            if closing != units:
+                problems.append(f"DailyStock {bg} closes at {closing} but Stock is {units}")
+        for bg, units, held in conn.execute(
+                """SELECT s.BloodGroup, s.Units, COALESCE(SUM(c.Units), 0)
+                   FROM Stock s LEFT JOIN CenterStock c ON c.BloodGroup = s.BloodGroup GROUP BY s.BloodGroup"""):
+            if units != held:
+                problems.append(f"Stock {bg} = {units} but the centers hold {held}")
+        for center, bg, units, held in conn.execute(
+                """SELECT c.Center, c.BloodGroup, c.Units,
+                          COALESCE((SELECT SUM(l.Remaining) FROM Lots l
+                                    WHERE l.Center = c.Center AND l.BloodGroup = c.BloodGroup), 0)
+                   FROM CenterStock c"""):
+            if units != held:
+                problems.append(f"CenterStock {center} {bg} = {units} but its lots hold {held}")
+            if units < 0:
+                problems.append(f"CenterStock {center} {bg} is negative ({units})")
+        for day, center, slot_time, booked, capacity, actual in conn.execute(
+                """SELECT s.SlotDate, s.Center, s.SlotTime, s.Booked, s.Capacity,
+                          (SELECT COUNT(*) FROM Bookings b WHERE b.BookingDate = s.SlotDate
+                           AND b.Center = s.Center AND b.BookingTime = s.SlotTime)
+                   FROM Slots s"""):
+            if booked != actual:
+                problems.append(f"Slot {day} {center} {slot_time} counts {booked} bookings, has {actual}")
+            if actual > capacity:
+                problems.append(f"Slot {day} {center} {slot_time} overbooked ({actual}/{capacity})")
+        counters = {row[:3]: row[3] for row in conn.execute("SELECT * FROM KpiSnapshot WHERE Value <> 0")}
+        recounted = {row[:3]: row[3] for row in conn.execute(kpi.SOURCE_SQL)}
+        for key in sorted(counters.keys() | recounted.keys()):
+            if counters.get(key, 0) != recounted.get(key, 0):
+                problems.append(f"KPI {' '.join(filter(None, key))} = {counters.get(key, 0)} "
+                                f"but recounts to {recounted.get(key, 0)}")
+        return problems
+    finally:
+        conn.close()
+
+
+def _summary(seconds):
+    ordered = sorted(seconds)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+
+    return {"reruns": len(ordered), "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+def run(path, mix, rounds=5, seed=0):
+    """Drive sessions concurrently, one process each, and collect their reruns.
+
+    mix: {journey name: number of sessions}. AppTest keeps a process-wide
+    runtime, so every session gets its own interpreter; they all share the
+    SQLite file at `path`, which is the contention being measured.
+    """
+    total = sum(mix.values())
+    prepare(path, total)
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(total), ctx.Queue()
+    workers = []
+    index = 0
+    for name, count in mix.items():
+        for _ in range(count):
+            workers.append(ctx.Process(target=_worker, args=(path, name, index, rounds, seed, barrier, results)))
+            index += 1
+    for worker in workers:
+        worker.start()
+    started = time.perf_counter()
+    collected = []
+    while len(collected) < len(workers):
+        try:
+            collected.append(results.get(timeout=1))
+        except queue.Empty:
+            # A worker that died before reporting would otherwise leave us waiting forever.
+            if all(worker.exitcode is not None for worker in workers) and results.empty():
+                break
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+    crashed = len(workers) - len(collected)
+
+    latencies, outcomes, exceptions = defaultdict(list), Counter(), Counter()
+    for stats in collected:
+        for step, seconds in stats["latencies"].items():
+            latencies[step].extend(seconds)
+        outcomes.update(stats["outcomes"])
+        exceptions.update(stats["exceptions"])
+    reruns = sum(len(seconds) for seconds in latencies.values())
+    everything = [s for seconds in latencies.values() for s in seconds]
+    return {
+        "sessions": dict(mix),
+        "rounds": rounds,
+        "elapsed_s": round(elapsed, 2),
+        "reruns": reruns,
+        "reruns_per_s": round(reruns / elapsed, 1) if elapsed else 0.0,
+        "overall": _summary(everything) if everything else {},
+        "steps": {step: _summary(seconds) for step, seconds in sorted(latencies.items())},
+        "busy_errors": sum(n for key, n in exceptions.items() if key.endswith(": busy")),
+        "exceptions": dict(exceptions),
+        "outcomes": dict(outcomes),
+        "crashed_sessions": crashed,
+        "violations": check_invariants(path),
+    }
+
+
+def report(result):
+    print(f"{result['reruns']} reruns in {result['elapsed_s']} s ({result['reruns_per_s']}/s), "
+          f"sessions {result['sessions']}")
+    print(f"{'step':<24}{'reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, s in [("(all)", result["overall"])] + list(result["steps"].items()):
+        if s:
+            print(f"{step:<24}{s['reruns']:>8}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    print(f"SQLITE_BUSY / locked errors: {result['busy_errors']}")
+    if result["crashed_sessions"]:
+        print(f"Sessions that died without reporting: {result['crashed_sessions']}")
+    for key, n in result["exceptions"].items():
+        print(f"    exception x{n}: {key}")
+    for key, n in result["outcomes"].items():
+        print(f"    shown x{n}: {key}")
+    if result["violations"]:
+        print("Invariant violations:")
+        for problem in result["violations"]:
+            print(f"    {problem}")
+    else:
+        print("Invariants hold: the ledger, Stock, CenterStock, lots, DailyStock, slot and KPI counts agree.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run concurrent headless LifeLink sessions against one database.")
+    parser.add_argument("--db", help="database file (default: a fresh temporary one)")
+    parser.add_argument("--sessions", type=int, default=4, help="sessions per journey")
+    parser.add_argument("--journeys", nargs="+", choices=list(JOURNEYS), default=list(JOURNEYS))
+    parser.add_argument("--rounds", type=int, default=5, help="times each session repeats its journey's core loop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or str(Path(tmp) / "loadtest.db")
+        result = run(path, {name: args.sessions for name in args.journeys}, args.rounds, args.seed)
+    report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(dict(result, timestamp=time.time()), indent=2))
+    return 1 if result["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+# lifelink/migrations.py
+import threading
+
+from lifelink import db, dedup, eligibility, inventory, kpi, search, slots, trend
+from lifelink.repository import BLOOD_GROUPS
+
+MIGRATIONS = []
+
+_applied = False
+_lock = threading.Lock()
+
+
+def migration(version, name):
+    def register(fn):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] < version, "migrations must be declared in order"
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+# ------------------ MIGRATIONS ------------------
+# Every migration must be safe to run against a database created by an
+# older admin.py/user.py that never had a schema_version table.
+
+@migration(1, "initial schema")
+def _initial_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS Users (
+                    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Username TEXT UNIQUE,
+                    Password TEXT,
+                    FullName TEXT,
+                    Age INTEGER,
+                    Gender TEXT,
+                    Contact TEXT
+                 )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS Donors (
+                    DonorID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Name TEXT,
+                    Age INTEGER,
+                    Gender TEXT,
+                    BloodGroup TEXT,
+                    Contact TEXT
+                 )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS Stock (
+                    BloodGroup TEXT PRIMARY KEY,
+                    Units INTEGER DEFAULT 0
+                 )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS Transactions (
+                    TransactionID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    DonorID INTEGER,
+                    BloodGroup TEXT,
+                    Units INTEGER,
+                    Type TEXT,
+                    Date TEXT
+                 )''')
+    conn.executemany("INSERT OR IGNORE INTO Stock (BloodGroup, Units) VALUES (?, 0)",
+                     [(bg,) for bg in BLOOD_GROUPS])
+
+
+@migration(2, "user roles")
+def _user_roles(conn):
+    if "Role" not in _columns(conn, "Users"):
+        conn.execute("ALTER TABLE Users ADD COLUMN Role TEXT DEFAULT 'User'")
+
+
+@migration(3, "donation bookings")
+def _bookings(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS Bookings (
+                    BookingID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Username TEXT,
+                    FullName TEXT,
+                    Contact TEXT,
+                    BloodGroup TEXT,
+                    Center TEXT,
+                    BookingDate TEXT,
+                    BookingTime TEXT,
+                    CreatedAt TEXT
+                 )''')
+
+
+@migration(4, "secondary indexes")
+def _secondary_indexes(conn):
+    # Covers search_donor entirely (DonorID is the rowid and rides along).
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_donors_bloodgroup
+                    ON Donors (BloodGroup, Name, Age, Gender, Contact)""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_bookings_user_slot
+                    ON Bookings (Username, BookingDate, BookingTime)""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_transactions_date
+                    ON Transactions (Date, BloodGroup, Type, Units)""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_transactions_group_date
+                    ON Transactions (BloodGroup, Date, Type, Units)""")
+
+
+@migration(5, "donor keyset pagination indexes")
+def _donor_pagination_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_donors_name ON Donors (Name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_donors_group_name ON Donors (BloodGroup, Name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_donors_group_id ON Donors (BloodGroup, DonorID)")
+
+
+@migration(6, "daily stock aggregate")
+def _daily_stock(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS DailyStock (
+                    Day TEXT,
+                    BloodGroup TEXT,
+                    Donated INTEGER DEFAULT 0,
+                    Issued INTEGER DEFAULT 0,
+                    Closing INTEGER,
+                    PRIMARY KEY (Day, BloodGroup)
+                 ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dailystock_group_day ON DailyStock (BloodGroup, Day)")
+    trend.rebuild(conn)
+
+
+@migration(7, "booking slot inventory")
+def _booking_slots(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS Slots (
+                    SlotDate TEXT,
+                    Center TEXT,
+                    SlotTime TEXT,
+                    Capacity INTEGER,
+                    Booked INTEGER DEFAULT 0,
+                    PRIMARY KEY (SlotDate, Center, SlotTime)
+                 ) WITHOUT ROWID''')
+    # Existing bookings keep their places, even where they already exceed the default capacity.
+    conn.execute("""INSERT OR IGNORE INTO Slots (SlotDate, Center, SlotTime, Capacity, Booked)
+                    SELECT BookingDate, Center, BookingTime, MAX(COUNT(*), ?), COUNT(*)
+                    FROM Bookings GROUP BY BookingDate, Center, BookingTime""", (slots.DEFAULT_CAPACITY,))
+
+
+@migration(8, "donor eligibility index")
+def _donor_eligibility(conn):
+    columns = _columns(conn, "Donors")
+    if "LastDonation" not in columns:
+        conn.execute("ALTER TABLE Donors ADD COLUMN LastDonation TEXT")
+    if "NextEligible" not in columns:
+        conn.execute("ALTER TABLE Donors ADD COLUMN NextEligible TEXT NOT NULL DEFAULT ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_donors_group_eligible ON Donors (BloodGroup, NextEligible)")
+    eligibility.rebuild(conn)
+
+
+@migration(9, "blood unit lots")
+def _blood_unit_lots(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS Lots (
+                    LotID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    TransactionID INTEGER,
+                    DonorID INTEGER,
+                    BloodGroup TEXT,
+                    Component TEXT,
+                    Collected TEXT,
+                    Expiry TEXT,
+                    Quantity INTEGER,
+                    Remaining INTEGER
+                 )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS LotIssues (
+                    TransactionID INTEGER,
+                    LotID INTEGER,
+                    Units INTEGER,
+                    PRIMARY KEY (TransactionID, LotID)
+                 ) WITHOUT ROWID''')
+    # Only lots with units left are indexed: FIFO issuing and the expiry report never
+    # look at depleted ones, so history can grow without slowing either down.
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_lots_group_expiry ON Lots (BloodGroup, Expiry, LotID)
+                    WHERE Remaining > 0""")
+
+
+@migration(10, "stock by center")
+def _stock_by_center(conn):
+    # A constant default adds the column without rewriting the table; what came
+    # before centers were tracked stays with the hospital blood bank.
+    for table in ("Transactions", "Lots"):
+        if "Center" not in _columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN Center TEXT NOT NULL DEFAULT '{slots.HOME_CENTER}'")
+    conn.execute('''CREATE TABLE IF NOT EXISTS CenterStock (
+                    Center TEXT,
+                    BloodGroup TEXT,
+                    Units INTEGER DEFAULT 0,
+                    PRIMARY KEY (Center, BloodGroup)
+                 ) WITHOUT ROWID''')
+    conn.execute("""INSERT OR IGNORE INTO CenterStock (Center, BloodGroup, Units)
+                    SELECT ?, BloodGroup, Units FROM Stock""", (slots.HOME_CENTER,))
+    conn.executemany("INSERT OR IGNORE INTO CenterStock (Center, BloodGroup, Units) VALUES (?, ?, 0)",
+                     [(center, bg) for center in slots.CENTERS for bg in BLOOD_GROUPS])
+    conn.execute('''CREATE TABLE IF NOT EXISTS Transfers (
+                    TransferID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    BloodGroup TEXT,
+                    Units INTEGER,
+                    FromCenter TEXT,
+                    ToCenter TEXT,
+                    Date TEXT
+                 )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transfers_date ON Transfers (Date)")
+    # FIFO now runs per center: the lot index gains Center ahead of Expiry.
+    conn.execute("DROP INDEX IF EXISTS idx_lots_group_expiry")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_lots_group_center_expiry ON Lots (BloodGroup, Center, Expiry, LotID)
+                    WHERE Remaining > 0""")
+    # Lots for the stock on hand are built here, once the schema knows about centers.
+    if not conn.execute("SELECT 1 FROM Lots LIMIT 1").fetchone():
+        inventory.rebuild(conn)
+
+
+@migration(11, "donor full-text search")
+def _donor_search(conn):
+    conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS DonorSearch USING fts5 (
+                    Name, Contact, content='Donors', content_rowid='DonorID', tokenize='trigram')""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS donors_search_insert AFTER INSERT ON Donors BEGIN
+                    INSERT INTO DonorSearch (rowid, Name, Contact) VALUES (new.DonorID, new.Name, new.Contact);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS donors_search_delete AFTER DELETE ON Donors BEGIN
+                    INSERT INTO DonorSearch (DonorSearch, rowid, Name, Contact)
+                    VALUES ('delete', old.DonorID, old.Name, old.Contact);
+                    END""")
+    # Only name and contact edits touch the index; eligibility updates to Donors skip it.
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS donors_search_update AFTER UPDATE OF Name, Contact ON Donors BEGIN
+                    INSERT INTO DonorSearch (DonorSearch, rowid, Name, Contact)
+                    VALUES ('delete', old.DonorID, old.Name, old.Contact);
+                    INSERT INTO DonorSearch (rowid, Name, Contact) VALUES (new.DonorID, new.Name, new.Contact);
+                    END""")
+    search.rebuild(conn)
+
+
+@migration(12, "duplicate donor detection")
+def _duplicate_donors(conn):
+    columns = _columns(conn, "Donors")
+    for column in ("ContactKey", "NameKey"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE Donors ADD COLUMN {column} TEXT")
+    # Blocking keys: only donors sharing one are ever compared.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_donors_contact_key ON Donors (ContactKey) WHERE ContactKey IS NOT NULL")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_donors_name_key ON Donors (NameKey, ContactKey)
+                    WHERE NameKey IS NOT NULL""")
+    conn.execute('''CREATE TABLE IF NOT EXISTS DuplicateCandidates (
+                    DonorA INTEGER,
+                    DonorB INTEGER,
+                    Score REAL,
+                    Reasons TEXT,
+                    Status TEXT DEFAULT 'open',
+                    Found TEXT,
+                    PRIMARY KEY (DonorA, DonorB)
+                 ) WITHOUT ROWID''')
+    # Only pairs still waiting for review are indexed for the review list.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_open ON DuplicateCandidates (Score) WHERE Status = 'open'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_b ON DuplicateCandidates (DonorB)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS DonorMerges (
+                    KeptID INTEGER,
+                    MergedID INTEGER,
+                    Transactions INTEGER,
+                    Date TEXT
+                 )''')
+    # Merges re-point a donor's history, so it has to be found without a scan.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_donor ON Transactions (DonorID) WHERE DonorID IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_donor ON Lots (DonorID) WHERE DonorID IS NOT NULL")
+    dedup.fill_keys(conn)
+
+
+@migration(13, "dashboard KPI snapshot")
+def _kpi_snapshot(conn):
+    # Day is '' for counters that are not per day (donors per group).
+    conn.execute('''CREATE TABLE IF NOT EXISTS KpiSnapshot (
+                    Metric TEXT,
+                    Day TEXT,
+                    Scope TEXT,
+                    Value INTEGER,
+                    PRIMARY KEY (Metric, Day, Scope)
+                 ) WITHOUT ROWID''')
+    kpi.rebuild(conn)
+
+
+@migration(14, "shared cache generations")
+def _cache_generations(conn):
+    # Bumped by every write (cache.record), so each server process sees the others' changes.
+    conn.execute('''CREATE TABLE IF NOT EXISTS Generations (
+                    TableName TEXT PRIMARY KEY,
+                    Generation INTEGER
+                 ) WITHOUT ROWID''')
+
+
+# ------------------ ENGINE ------------------
+def current_version(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (Version INTEGER PRIMARY KEY, Name TEXT, AppliedAt TEXT)")
+    return conn.execute("SELECT COALESCE(MAX(Version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate():
+    """Apply pending migrations, each in its own write transaction. Returns the versions applied."""
+    with db.connection() as conn:
+        if current_version(conn) >= MIGRATIONS[-1][0]:
+            return []
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        # BEGIN IMMEDIATE takes the write lock before re-checking the version, so
+        # two processes starting at once cannot apply the same migration twice.
+        with db.transaction(immediate=True) as conn:
+            if current_version(conn) >= version:
+                continue
+            fn(conn)
+            conn.execute("INSERT INTO schema_version (Version, Name, AppliedAt) VALUES (?, ?, datetime('now'))",
+                         (version, name))
+            applied.append(version)
+    return applied
+
+
+def ensure_schema():
+    """Run migrate() once per process; every later Streamlit rerun is a flag check."""
+    global _applied
+    if _applied:
+        return
+    with _lock:
+        if not _applied:
+            migrate()
+            _applied = True
+
+
+def reset():
+    """Forget that the schema was checked, e.g. after db.configure() points at a new file."""
+    global _applied
+    with _lock:
+        _applied = False
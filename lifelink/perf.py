@@ -0,0 +1,280 @@
+# lifelink/perf.py
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Off unless LIFELINK_PERF=1 or an admin switches it on; every hook checks this flag first.
+ENABLED = os.environ.get("LIFELINK_PERF") == "1"
+EXPORT_PATH = os.environ.get("LIFELINK_PERF_FILE", "lifelink-perf.json")
+MAX_RERUNS = 500    # most recent reruns kept per process
+MAX_SPANS = 200     # spans kept per rerun; the counters keep going past it
+
+_local = threading.local()
+_lock = threading.Lock()
+_reruns = deque(maxlen=MAX_RERUNS)
+_queries = {}       # normalized SQL -> [calls, total seconds, max seconds, statements]
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+class Rerun:
+    """One top-to-bottom run of an app script, or one unit of background work."""
+
+    def __init__(self, app, page=None):
+        self.app = app
+        self.page = page
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.wall = None
+        self.queries = 0
+        self.query_time = 0.0
+        self.spans = []          # (name, kind, offset seconds, duration seconds)
+        self.interrupted = False
+
+    def add(self, name, kind, started, duration):
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, kind, started - self.started, duration))
+
+    def as_dict(self):
+        return {
+            "app": self.app, "page": self.page, "timestamp": self.timestamp,
+            "wall_ms": round(self.wall * 1000, 3), "queries": self.queries,
+            "query_ms": round(self.query_time * 1000, 3), "interrupted": self.interrupted,
+            "spans": [{"name": name, "kind": kind, "offset_ms": round(offset * 1000, 3),
+                       "duration_ms": round(duration * 1000, 3)} for name, kind, offset, duration in self.spans],
+        }
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def reset():
+    with _lock:
+        _reruns.clear()
+        _queries.clear()
+
+
+# ------------------ RERUNS ------------------
+def begin(app):
+    """Start timing a rerun on this thread (Streamlit runs each session's script on its own thread).
+
+    Both apps call begin() at the top of the script and end() at the bottom.
+    st.rerun() and st.stop() unwind the script before it reaches end(), so a
+    rerun still open here was cut short and is recorded as interrupted.
+    """
+    if not ENABLED:
+        return
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.interrupted = True
+        _finish(current)
+    _local.rerun = Rerun(app)
+
+
+def page(name):
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.page = name
+
+
+def end():
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        _local.rerun = None
+        _finish(current)
+
+
+def _finish(current):
+    current.wall = time.perf_counter() - current.started
+    _reruns.append(current)
+
+
+# ------------------ SPANS ------------------
+@contextmanager
+def span(name, kind="render"):
+    """Time a block inside the current rerun; outside any rerun it is recorded as background work."""
+    if not ENABLED:
+        yield
+        return
+    current = getattr(_local, "rerun", None)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        if current is not None:
+            current.add(name, kind, started, duration)
+        else:
+            background = Rerun("background", name)
+            background.started = started
+            background.add(name, kind, started, duration)
+            background.wall = duration
+            _reruns.append(background)
+
+
+def timed(name, kind="render"):
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ------------------ QUERIES ------------------
+def normalize(sql):
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+def record_query(sql, started, duration, statements=1):
+    """Called by the db helpers (only while enabled) once per query or transaction."""
+    key = normalize(sql)
+    with _lock:
+        entry = _queries.setdefault(key, [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+        entry[3] += statements
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.queries += statements
+        current.query_time += duration
+        current.add(key, "sql", started, duration)
+
+
+def charge(name, started, duration):
+    """Charge SQL another thread ran for this rerun -- a queued write -- as one query of `duration`.
+
+    Only the rerun is charged: the writer thread records the transaction itself in the query table.
+    """
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.queries += 1
+        current.query_time += duration
+        current.add(name, "sql", started, duration)
+
+
+@contextmanager
+def query(sql):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_query(sql, started, time.perf_counter() - started)
+
+
+@contextmanager
+def transaction(conn):
+    """Time a whole transaction and count its statements via SQLite's trace callback.
+
+    It is keyed by its first statement after BEGIN, with literals stripped.
+    """
+    statements = []
+    conn.set_trace_callback(statements.append)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        conn.set_trace_callback(None)
+        body = [s for s in statements if s not in ("BEGIN", "BEGIN IMMEDIATE", "COMMIT", "ROLLBACK")]
+        if body:
+            record_query(f"TXN {body[0]}", started, duration, len(body))
+
+
+# ------------------ REPORTS ------------------
+def recent(limit=50):
+    return list(_reruns)[-limit:][::-1]
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def slowest_pages(limit=20):
+    """Per app/page: reruns, p50/p95/max wall time and average queries, slowest p95 first."""
+    groups = {}
+    for r in list(_reruns):
+        groups.setdefault((r.app, r.page), []).append(r)
+    rows = []
+    for (app, name), runs in groups.items():
+        walls = sorted(r.wall for r in runs)
+        rows.append({
+            "app": app, "page": name, "reruns": len(runs),
+            "p50_ms": _percentile(walls, 50) * 1000, "p95_ms": _percentile(walls, 95) * 1000,
+            "max_ms": walls[-1] * 1000,
+            "avg_queries": sum(r.queries for r in runs) / len(runs),
+            "avg_query_ms": sum(r.query_time for r in runs) / len(runs) * 1000,
+        })
+    rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+    return rows[:limit]
+
+
+def slowest_queries(limit=20):
+    with _lock:
+        items = list(_queries.items())
+    rows = [{"sql": sql, "calls": calls, "statements": statements, "total_ms": total * 1000,
+             "avg_ms": total / calls * 1000, "max_ms": worst * 1000}
+            for sql, (calls, total, worst, statements) in items]
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:limit]
+
+
+# ------------------ EXPORT ------------------
+def to_json():
+    return {"exported": time.time(), "reruns": [r.as_dict() for r in list(_reruns)],
+            "queries": slowest_queries(limit=None)}
+
+
+def to_otlp():
+    """The recorded reruns as OTLP/JSON trace data: one trace per rerun, spans as its children."""
+    spans = []
+    for r in list(_reruns):
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        start_ns = int(r.timestamp * 1e9)
+        spans.append({
+            "traceId": trace_id, "spanId": root_id, "name": f"{r.app}/{r.page}", "kind": 1,
+            "startTimeUnixNano": str(start_ns), "endTimeUnixNano": str(start_ns + int(r.wall * 1e9)),
+            "attributes": [
+                {"key": "lifelink.queries", "value": {"intValue": str(r.queries)}},
+                {"key": "lifelink.query_ms", "value": {"doubleValue": r.query_time * 1000}},
+                {"key": "lifelink.interrupted", "value": {"boolValue": r.interrupted}},
+            ],
+        })
+        for name, kind, offset, duration in r.spans:
+            child_start = start_ns + int(offset * 1e9)
+            spans.append({
+                "traceId": trace_id, "spanId": os.urandom(8).hex(), "parentSpanId": root_id,
+                "name": name, "kind": 3 if kind == "sql" else 1,
+                "startTimeUnixNano": str(child_start), "endTimeUnixNano": str(child_start + int(duration * 1e9)),
+                "attributes": [{"key": "lifelink.kind", "value": {"stringValue": kind}}]
+                              + ([{"key": "db.system", "value": {"stringValue": "sqlite"}}] if kind == "sql" else []),
+            })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "lifelink"}}]},
+        "scopeSpans": [{"scope": {"name": "lifelink.perf"}, "spans": spans}],
+    }]}
+
+
+def dumps(fmt="json"):
+    """What has been recorded so far as a JSON document; fmt is "json" or "otlp"."""
+    return json.dumps(to_otlp() if fmt == "otlp" else to_json(), indent=1)
+
+
+def export(path=EXPORT_PATH, fmt="json"):
+    """Write dumps(fmt) to `path` (scripts only; the Performance page offers it as a download)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(fmt))
+    return path
@@ -0,0 +1,73 @@
+# lifelink/queryplan.py
+import sys
+
+from lifelink import db
+
+HOT_QUERIES = {}
+
+# Plan steps that mean a registered query touches every row or sorts in a temp table.
+REGRESSIONS = ("SCAN", "USE TEMP B-TREE")
+
+
+def _regressed(step):
+    # Virtual tables (FTS5) always report SCAN; an empty index string means nothing constrained it.
+    if " VIRTUAL TABLE INDEX " in step:
+        return step.endswith(":")
+    return step.startswith(REGRESSIONS)
+
+
+def register(name, sql, params=(), allow_scan=False):
+    """Register a hot query for the plan audit; returns sql so it can be used as a constant."""
+    HOT_QUERIES[name] = (sql, tuple(params), allow_scan)
+    return sql
+
+
+def explain(sql, params=(), conn=None):
+    if conn is None:
+        with db.connection() as conn:
+            return explain(sql, params, conn)
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def audit(conn=None):
+    """Return {query name: offending plan steps} for every registered query that regressed."""
+    failures = {}
+    for name, (sql, params, allow_scan) in HOT_QUERIES.items():
+        if allow_scan:
+            continue
+        bad = [step for step in explain(sql, params, conn) if _regressed(step)]
+        if bad:
+            failures[name] = bad
+    return failures
+
+
+def assert_no_scans(conn=None):
+    failures = audit(conn)
+    if failures:
+        lines = [f"{name}: {'; '.join(steps)}" for name, steps in sorted(failures.items())]
+        raise AssertionError("query plan regressions:\n" + "\n".join(lines))
+
+
+def main(argv):
+    from lifelink import compatibility, migrations, repository  # noqa: F401  (registers the hot queries)
+
+    if argv:
+        db.configure(argv[0])
+    migrations.ensure_schema()
+    for name, (sql, params, allow_scan) in sorted(HOT_QUERIES.items()):
+        print(f"{name}{' (scan allowed)' if allow_scan else ''}")
+        for step in explain(sql, params):
+            print(f"    {step}")
+    failures = audit()
+    if failures:
+        print(f"\n{len(failures)} hot queries regressed: {', '.join(sorted(failures))}")
+        return 1
+    print("\nall hot queries use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m lifelink.queryplan [path/to/lifelink.db]
+    from lifelink import queryplan  # the registry lives on the imported module, not __main__
+
+    sys.exit(queryplan.main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+# lifelink/repository.py
+import hashlib
+import sqlite3
+
+from lifelink import cache, db, dedup, inventory, kpi, ledger, queryplan, slots, writer
+from lifelink.ledger import InsufficientStock  # noqa: F401  (re-exported for the apps)
+from lifelink.slots import SlotFull  # noqa: F401
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+GENDERS = ['Male', 'Female', 'Other']
+
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+# ------------------ USERS ------------------
+def create_user(username, password, full_name, age, gender, contact, role="User"):
+    """Returns False if the username is already taken."""
+    def run(conn):
+        conn.execute("""INSERT INTO Users (Username, Password, FullName, Age, Gender, Contact, Role)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     (username, hash_password(password), full_name, age, gender, contact, role))
+
+    try:
+        writer.write(run, "Users")
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+LOGIN_SQL = queryplan.register(
+    "login", "SELECT Username, Role FROM Users WHERE Username=? AND Password=?", ("u", "p"))
+PROFILE_SQL = queryplan.register(
+    "get_user_profile", "SELECT FullName, Age, Gender, Contact FROM Users WHERE Username=?", ("u",))
+
+
+def login(username, password):
+    return db.fetchone(LOGIN_SQL, (username, hash_password(password)))
+
+
+@cache.cached("Users")
+def get_user_profile(username):
+    return db.fetchone(PROFILE_SQL, (username,))
+
+
+def update_profile(username, full_name, age, gender, contact):
+    def run(conn):
+        conn.execute("UPDATE Users SET FullName=?, Age=?, Gender=?, Contact=? WHERE Username=?",
+                     (full_name, age, gender, contact, username))
+
+    writer.write(run, "Users")
+
+
+# ------------------ DONORS ------------------
+def add_donor(name, age, gender, blood_group, contact):
+    """Returns the new DonorID; likely duplicates of it are recorded for review (dedup.candidates_for)."""
+    contact_key, name_key = dedup.keys(name, blood_group, contact)
+
+    def run(conn):
+        donor_id = conn.execute("""INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact, ContactKey, NameKey)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                                (name, age, gender, blood_group.upper(), contact, contact_key, name_key)).lastrowid
+        dedup.check(conn, donor_id)
+        kpi.count_donor(conn, None, blood_group.upper())
+        return donor_id
+
+    return writer.write(run, "Donors", "DuplicateCandidates", "KpiSnapshot")
+
+
+def update_donor(donor_id, name, age, gender, blood_group, contact):
+    contact_key, name_key = dedup.keys(name, blood_group, contact)
+
+    def run(conn):
+        old = conn.execute("SELECT BloodGroup FROM Donors WHERE DonorID=?", (donor_id,)).fetchone()
+        conn.execute("""UPDATE Donors SET Name=?, Age=?, Gender=?, BloodGroup=?, Contact=?, ContactKey=?, NameKey=?
+                        WHERE DonorID=?""",
+                     (name, age, gender, blood_group.upper(), contact, contact_key, name_key, donor_id))
+        dedup.check(conn, donor_id)
+        if old:
+            kpi.count_donor(conn, old[0], blood_group.upper())
+
+    writer.write(run, "Donors", "DuplicateCandidates", "KpiSnapshot")
+
+
+def delete_donor(donor_id):
+    """Returns the deleted donor's BloodGroup, or None when no donor has that ID."""
+    def run(conn):
+        dedup.forget(conn, donor_id)
+        row = conn.execute("DELETE FROM Donors WHERE DonorID=? RETURNING BloodGroup", (donor_id,)).fetchone()
+        if row:
+            kpi.count_donor(conn, row[0], None)
+        return row[0] if row else None
+
+    return writer.write(run, "Donors", "DuplicateCandidates", "KpiSnapshot")
+
+
+SEARCH_DONOR_SQL = queryplan.register(
+    "search_donor", "SELECT DonorID, Name, Age, Gender, Contact FROM Donors WHERE BloodGroup=?", ("A+",))
+ALL_DONORS_SQL = queryplan.register(
+    "view_all_donors", "SELECT DonorID, Name, Age, Gender, BloodGroup, Contact FROM Donors", allow_scan=True)
+
+
+@cache.cached("Donors")
+def search_donor(blood_group):
+    return db.fetchall(SEARCH_DONOR_SQL, (blood_group.upper(),))
+
+
+@cache.cached("Donors")
+def view_all_donors():
+    return db.fetchall(ALL_DONORS_SQL)
+
+
+# Keyset pagination: each sort is a unique key so "the row after the cursor"
+# is an index seek, no matter how deep into the table the page is.
+DONOR_SORTS = {"ID": ("DonorID",), "Name": ("Name", "DonorID")}
+# The index each sort walks, (all donors, one blood group). Naming it keeps every
+# page a seek whatever the planner statistics say; the ID sort walks the table itself.
+DONOR_PAGE_INDEXES = {"ID": ("NOT INDEXED", "INDEXED BY idx_donors_group_id"),
+                      "Name": ("INDEXED BY idx_donors_name", "INDEXED BY idx_donors_group_name")}
+DONOR_COLUMNS = "DonorID, Name, Age, Gender, BloodGroup, Contact"
+
+
+def _donor_page_sql(filtered, sort, descending, has_cursor):
+    keys = DONOR_SORTS[sort]
+    where = ["BloodGroup=?"] if filtered else []
+    if has_cursor:
+        where.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})")
+    order = ", ".join(f"{k} DESC" if descending else k for k in keys)
+    return (f"SELECT {DONOR_COLUMNS} FROM Donors {DONOR_PAGE_INDEXES[sort][filtered]}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY {order} LIMIT ?")
+
+
+def _register_donor_page_queries():
+    for sort in DONOR_SORTS:
+        cursor = (1,) if sort == "ID" else ("a", 1)
+        for descending in (False, True):
+            label = sort + (" desc" if descending else "")
+            queryplan.register(f"donor_page[{label}]",
+                               _donor_page_sql(False, sort, descending, True), cursor + (51,))
+            queryplan.register(f"donor_page[group, {label}]",
+                               _donor_page_sql(True, sort, descending, True), ("A+",) + cursor + (51,))
+
+
+_register_donor_page_queries()
+
+
+@cache.cached("Donors")
+def donor_page(blood_group=None, after=None, limit=50, sort="ID", descending=False):
+    """One page of donors plus the cursor for the next page (None on the last page).
+
+    Rows are (DonorID, Name, Age, Gender, BloodGroup, Contact); `after` is a
+    cursor previously returned by this function for the same filter and sort.
+    """
+    keys = DONOR_SORTS[sort]
+    params = [blood_group.upper()] if blood_group else []
+    params += list(after or ())
+    rows = db.fetchall(_donor_page_sql(bool(blood_group), sort, descending, after is not None),
+                       params + [limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, tuple(last[0] if k == "DonorID" else last[1] for k in keys)
+
+
+@cache.cached("Donors")
+def count_donors(blood_group=None):
+    if blood_group:
+        return db.fetchone("SELECT COUNT(*) FROM Donors WHERE BloodGroup=?", (blood_group.upper(),))[0]
+    return db.fetchone("SELECT COUNT(*) FROM Donors")[0]
+
+
+def get_donor(donor_id):
+    return db.fetchone(f"SELECT {DONOR_COLUMNS} FROM Donors WHERE DonorID=?", (donor_id,))
+
+
+# ------------------ STOCK ------------------
+STOCK_SQL = queryplan.register(
+    "view_stock", "SELECT BloodGroup, Units FROM Stock ORDER BY BloodGroup", allow_scan=True)
+TRANSACTIONS_SQL = queryplan.register(
+    "transactions_between",
+    """SELECT Date, BloodGroup, Type, Units FROM Transactions
+       WHERE Date >= ? AND Date < ? ORDER BY Date""",
+    ("2024-01-01", "2024-02-01"))
+GROUP_TRANSACTIONS_SQL = queryplan.register(
+    "group_transactions_between",
+    """SELECT Date, BloodGroup, Type, Units FROM Transactions
+       WHERE BloodGroup=? AND Date >= ? AND Date < ? ORDER BY Date""",
+    ("A+", "2024-01-01", "2024-02-01"))
+
+
+CENTER_STOCK_SQL = queryplan.register(
+    "center_stock", "SELECT BloodGroup, Units FROM CenterStock WHERE Center=? ORDER BY BloodGroup",
+    ("Central Hospital",))
+# Centers x blood groups rows of maintained totals, so this stays small however long the ledger grows.
+STOCK_BY_CENTER_SQL = queryplan.register(
+    "stock_by_center", "SELECT Center, BloodGroup, Units FROM CenterStock ORDER BY Center, BloodGroup",
+    allow_scan=True)
+# Walks the Date index backwards and stops after `limit` rows.
+TRANSFERS_SQL = queryplan.register(
+    "recent_transfers",
+    "SELECT Date, BloodGroup, Units, FromCenter, ToCenter FROM Transfers ORDER BY Date DESC LIMIT ?", (20,),
+    allow_scan=True)
+
+
+@cache.cached("Stock")
+def view_stock():
+    """Network-wide units per group."""
+    return db.fetchall(STOCK_SQL)
+
+
+@cache.cached("CenterStock")
+def view_center_stock(center):
+    return db.fetchall(CENTER_STOCK_SQL, (center,))
+
+
+@cache.cached("CenterStock")
+def stock_by_center():
+    return db.fetchall(STOCK_BY_CENTER_SQL)
+
+
+@cache.cached("Transfers")
+def recent_transfers(limit=20):
+    return db.fetchall(TRANSFERS_SQL, (limit,))
+
+
+@cache.cached("Transactions")
+def transactions_between(start, end, blood_group=None):
+    """Stock movements with start <= Date < end (ISO strings), oldest first."""
+    if blood_group:
+        return db.fetchall(GROUP_TRANSACTIONS_SQL, (blood_group.upper(), start, end))
+    return db.fetchall(TRANSACTIONS_SQL, (start, end))
+
+
+def update_stock(blood_group, units, t_type, donor_id=None, component=inventory.DEFAULT_COMPONENT,
+                 center=slots.HOME_CENTER):
+    """Raises InsufficientStock when an Issue exceeds the center's unexpired units; Issues go out FIFO by expiry."""
+    ledger.record(blood_group, units, t_type, donor_id, component, center)
+
+
+def transfer_stock(blood_group, units, from_center, to_center):
+    """Raises InsufficientStock when the source center is short."""
+    return ledger.transfer(blood_group, units, from_center, to_center)
+
+
+# ------------------ BOOKINGS ------------------
+def create_booking(username, full_name, contact, blood_group, center, booking_date, booking_time):
+    """Raises SlotFull when the center has no places left at that date and time."""
+    return slots.reserve(username, full_name, contact, blood_group, center, booking_date, booking_time)
+
+
+USER_BOOKINGS_SQL = queryplan.register(
+    "get_user_bookings",
+    """SELECT BookingID, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt
+       FROM Bookings WHERE Username=? ORDER BY BookingDate, BookingTime""",
+    ("u",))
+
+
+@cache.cached("Bookings")
+def get_user_bookings(username):
+    return db.fetchall(USER_BOOKINGS_SQL, (username,))
+
+
+def cancel_booking(booking_id, username):
+    return slots.cancel(booking_id, username)
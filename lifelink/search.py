@@ -0,0 +1,63 @@
+# lifelink/search.py
+from lifelink import cache, db, queryplan
+
+# DonorSearch is an external-content FTS5 table over Donors(Name, Contact) with the
+# trigram tokenizer, so any 3+ character substring of a name or number is an index
+# lookup. Triggers on Donors keep it in sync (see migration 11).
+MIN_TERM = 3
+DEFAULT_LIMIT = 50
+
+SEARCH_COLUMNS = "d.DonorID, d.Name, d.Age, d.Gender, d.BloodGroup, d.Contact, d.LastDonation"
+
+
+def _search_sql(groups, eligible):
+    # Keyset pages on the FTS rowid (the DonorID): the first page starts after 0.
+    where = f" AND d.BloodGroup IN ({', '.join('?' * groups)})" if groups else ""
+    if eligible:
+        where += " AND d.NextEligible <= ?"
+    return (f"SELECT {SEARCH_COLUMNS} FROM DonorSearch JOIN Donors d ON d.DonorID = DonorSearch.rowid "
+            f"WHERE DonorSearch MATCH ? AND DonorSearch.rowid > ?{where} ORDER BY DonorSearch.rowid LIMIT ?")
+
+
+queryplan.register("find_donors", _search_sql(0, False), ('"sha"', 0, DEFAULT_LIMIT + 1))
+queryplan.register("find_eligible_donors_in_groups", _search_sql(2, True),
+                   ('"sha"', 0, "O+", "O-", "2024-01-01", DEFAULT_LIMIT + 1))
+
+
+def match_expression(text):
+    """FTS5 query for what was typed: every 3+ character word must appear somewhere in Name or Contact.
+
+    Shorter words cannot be matched by trigrams and are dropped; returns None
+    when nothing searchable is left.
+    """
+    terms = [t for t in text.split() if len(t) >= MIN_TERM]
+    if not terms:
+        return None
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+# ------------------ MAINTENANCE ------------------
+def rebuild(conn):
+    """Re-index every donor, e.g. after Donors was changed with the triggers missing."""
+    conn.execute("INSERT INTO DonorSearch (DonorSearch) VALUES ('rebuild')")
+
+
+# ------------------ SEARCH ------------------
+@cache.cached("Donors")
+def find_donors(text, blood_groups=(), eligible_on=None, after=None, limit=DEFAULT_LIMIT):
+    """One page of donors whose name or contact contains every word of `text`, oldest DonorID first.
+
+    blood_groups (a tuple) narrows the result to those groups, empty means
+    all; eligible_on (ISO date) keeps only donors who may donate that day.
+    Returns (rows, cursor for the next page or None) like repository.donor_page.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return [], None
+    params = ((expression, after or 0, *blood_groups) + ((eligible_on,) if eligible_on else ())
+              + (limit + 1,))
+    rows = db.fetchall(_search_sql(len(blood_groups), bool(eligible_on)), params)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, rows[-1][0]
@@ -0,0 +1,100 @@
+# lifelink/slots.py
+import os
+from datetime import datetime
+
+from lifelink import cache, db, kpi, queryplan, writer
+
+CENTERS = ["City Hall", "Community Center", "Central Hospital", "Mobile Unit"]
+# Stock and movements recorded before centers were tracked belong to the hospital blood bank.
+HOME_CENTER = "Central Hospital"
+TIME_SLOTS = ["09:00 AM", "10:00 AM", "11:00 AM", "12:00 PM", "01:00 PM", "02:00 PM", "03:00 PM"]
+
+# Donors per center per time slot unless a slot row says otherwise (see set_capacity).
+DEFAULT_CAPACITY = int(os.environ.get("LIFELINK_SLOT_CAPACITY", 6))
+
+
+class SlotFull(Exception):
+    pass
+
+
+AVAILABILITY_SQL = queryplan.register(
+    "slot_availability",
+    "SELECT SlotDate, Center, SlotTime, Capacity, Booked FROM Slots WHERE SlotDate >= ? AND SlotDate <= ?",
+    ("2024-01-01", "2024-01-31"))
+
+
+# ------------------ RESERVATIONS ------------------
+def _claim(conn, center, slot_date, slot_time):
+    # Slot rows are created on first use; the conditional UPDATE is the capacity check.
+    conn.execute("INSERT OR IGNORE INTO Slots (SlotDate, Center, SlotTime, Capacity, Booked) VALUES (?, ?, ?, ?, 0)",
+                 (slot_date, center, slot_time, DEFAULT_CAPACITY))
+    cur = conn.execute("""UPDATE Slots SET Booked = Booked + 1
+                          WHERE SlotDate=? AND Center=? AND SlotTime=? AND Booked < Capacity""",
+                       (slot_date, center, slot_time))
+    if cur.rowcount == 0:
+        raise SlotFull(f"{center} {slot_date} {slot_time}")
+
+
+def reserve(username, full_name, contact, blood_group, center, booking_date, booking_time):
+    """Book one place in a slot; raises SlotFull when it has no capacity left."""
+    def run(conn):
+        _claim(conn, center, booking_date, booking_time)
+        kpi.add(conn, kpi.BOOKINGS, center, 1, booking_date)
+        return conn.execute("""INSERT INTO Bookings
+                               (Username, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                            (username, full_name, contact, blood_group, center, booking_date, booking_time,
+                             datetime.now().isoformat())).lastrowid
+
+    return writer.write(run, "Bookings", "Slots", "KpiSnapshot")
+
+
+def cancel(booking_id, username):
+    """Cancel a user's booking and give its place back to the slot. Returns rows deleted."""
+    def run(conn):
+        row = conn.execute("""DELETE FROM Bookings WHERE BookingID=? AND Username=?
+                              RETURNING Center, BookingDate, BookingTime""",
+                           (booking_id, username)).fetchone()
+        if row is None:
+            return 0
+        conn.execute("""UPDATE Slots SET Booked = Booked - 1
+                        WHERE Center=? AND SlotDate=? AND SlotTime=? AND Booked > 0""", row)
+        kpi.add(conn, kpi.BOOKINGS, row[0], -1, row[1])
+        return 1
+
+    return writer.write(run, "Bookings", "Slots", "KpiSnapshot")
+
+
+def set_capacity(center, slot_date, slot_time, capacity):
+    """Override one slot's capacity; it never drops below the places already booked."""
+    def run(conn):
+        conn.execute("""INSERT INTO Slots (SlotDate, Center, SlotTime, Capacity, Booked) VALUES (?, ?, ?, ?, 0)
+                        ON CONFLICT (SlotDate, Center, SlotTime) DO UPDATE SET Capacity = MAX(excluded.Capacity, Booked)""",
+                     (slot_date, center, slot_time, capacity))
+
+    writer.write(run, "Slots")
+
+
+# ------------------ AVAILABILITY ------------------
+@cache.cached("Slots")
+def availability(start, end):
+    """Free places for every center, day and time slot with start <= date <= end (ISO dates).
+
+    One range query over the Slots primary key; slots nobody has booked yet
+    have no row and are reported at DEFAULT_CAPACITY. Returns
+    {(date, center, time): free places}.
+    """
+    taken = {(d, c, t): cap - booked for d, c, t, cap, booked in db.fetchall(AVAILABILITY_SQL, (start, end))}
+    first, last = datetime.fromisoformat(start).toordinal(), datetime.fromisoformat(end).toordinal()
+    free = {}
+    for day in range(first, last + 1):
+        iso = datetime.fromordinal(day).date().isoformat()
+        for center in CENTERS:
+            for slot_time in TIME_SLOTS:
+                free[(iso, center, slot_time)] = max(taken.get((iso, center, slot_time), DEFAULT_CAPACITY), 0)
+    return free
+
+
+def open_slots(center, slot_date, free):
+    """Time slots with places left at `center` on `slot_date`, from an availability() result."""
+    return [(t, free[(slot_date, center, t)]) for t in TIME_SLOTS if free.get((slot_date, center, t), 0) > 0]
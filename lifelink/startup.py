@@ -0,0 +1,70 @@
+# lifelink/startup.py
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(script, runs=3):
+    """Cold-start profile of one app: wall time and import time per top-level package.
+
+    Each run is a fresh interpreter executing the script in Streamlit's bare
+    mode against an empty temporary database, i.e. the first render of the
+    login page. Import times are self times (microseconds) summed per
+    top-level package, taken from the fastest run.
+    """
+    best = None
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, LIFELINK_DB=str(Path(tmp) / "startup.db"), PYTHONDONTWRITEBYTECODE="1")
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", str(BASE_DIR / script)],
+                                  cwd=BASE_DIR, env=env, capture_output=True, text=True)
+            wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"{script} failed to start:\n{proc.stderr[-2000:]}")
+        if best is None or wall < best[0]:
+            best = (wall, proc.stderr)
+
+    wall, stderr = best
+    packages = Counter()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            packages[match.group(4).split(".")[0]] += int(match.group(1))
+    return {
+        "script": script,
+        "wall_ms": round(wall * 1000, 1),
+        "import_ms": round(sum(packages.values()) / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in packages.most_common()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure LifeLink cold-start time per app.")
+    parser.add_argument("scripts", nargs="*", default=["admin.py", "user.py"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file for comparing runs")
+    args = parser.parse_args(argv)
+
+    results = [measure(script, args.runs) for script in args.scripts]
+    for result in results:
+        print(f"{result['script']}: {result['wall_ms']:.0f} ms wall, {result['import_ms']:.0f} ms importing")
+        for name, ms in list(result["packages_ms"].items())[:args.top]:
+            print(f"    {name:<24}{ms:>8.1f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"timestamp": time.time(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# lifelink/synthetic.py
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from lifelink import cache, db, dedup, eligibility, inventory, kpi, migrations, slots, trend
+from lifelink.repository import BLOOD_GROUPS, hash_password
+
+# Share of each group in the donor population (ABO/Rh frequencies of a typical blood bank).
+BLOOD_GROUP_WEIGHTS = {"O+": 0.374, "A+": 0.357, "B+": 0.085, "AB+": 0.034,
+                       "O-": 0.066, "A-": 0.063, "B-": 0.015, "AB-": 0.006}
+GENDER_WEIGHTS = {"Male": 0.58, "Female": 0.41, "Other": 0.01}
+# Share of stock movements recorded at each center.
+CENTER_WEIGHTS = {"Central Hospital": 0.55, "City Hall": 0.2, "Community Center": 0.15, "Mobile Unit": 0.1}
+
+# Rows per table for a given --scale (the donor count); every table can also be set on its own.
+RATIOS = {"donors": 1.0, "users": 0.1, "transactions": 1.0, "bookings": 0.1}
+HISTORY_DAYS = 3 * 365
+BOOKING_HORIZON = 30   # bookings run up to this many days into the future
+CHUNK = 50_000
+DEFAULT_PASSWORD = "password"   # every generated user can log in with it
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Rohan", "Kabir",
+               "Ananya", "Diya", "Saanvi", "Aadhya", "Pari", "Isha", "Meera", "Priya", "Riya", "Sanika",
+               "James", "Maria", "David", "Sarah", "Michael", "Fatima", "Chen", "Yuki", "Omar", "Elena"]
+LAST_NAMES = ["Sharma", "Patel", "Singh", "Kumar", "Gupta", "Reddy", "Iyer", "Nair", "Joshi", "Desai",
+              "Kulkarni", "Mehta", "Shah", "Rao", "Das", "Smith", "Garcia", "Khan", "Wang", "Ivanova"]
+
+
+def _weighted(rng, weights, size):
+    names = list(weights)
+    p = np.array([weights[name] for name in names])
+    return np.array(names, dtype=object)[rng.choice(len(names), size=size, p=p / p.sum())]
+
+
+def _names(rng, size):
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), size)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size)]
+    return first + " " + last
+
+
+def _contacts(rng, size):
+    return [str(n) for n in rng.integers(7_000_000_000, 9_999_999_999, size)]
+
+
+def _chunks(total, chunk=CHUNK):
+    for start in range(0, total, chunk):
+        yield start, min(chunk, total - start)
+
+
+def _insert(sql, rows):
+    with db.transaction(immediate=True) as conn:
+        conn.executemany(sql, rows)
+
+
+# ------------------ TABLES ------------------
+def users(rng, count, first_id=0):
+    password = hash_password(DEFAULT_PASSWORD)
+    for start, size in _chunks(count):
+        ages = rng.integers(18, 66, size).tolist()
+        _insert("""INSERT INTO Users (Username, Password, FullName, Age, Gender, Contact, Role)
+                   VALUES (?, ?, ?, ?, ?, ?, 'User')""",
+                zip((f"user{first_id + start + i}" for i in range(size)), [password] * size,
+                    _names(rng, size), ages, _weighted(rng, GENDER_WEIGHTS, size), _contacts(rng, size)))
+
+
+def donors(rng, count):
+    for _, size in _chunks(count):
+        _insert("INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact) VALUES (?, ?, ?, ?, ?)",
+                zip(_names(rng, size), rng.integers(18, 66, size).tolist(), _weighted(rng, GENDER_WEIGHTS, size),
+                    _weighted(rng, BLOOD_GROUP_WEIGHTS, size), _contacts(rng, size)))
+    with db.transaction(immediate=True) as conn:
+        dedup.fill_keys(conn)
+
+
+def transactions(rng, count, days=HISTORY_DAYS, today=None):
+    """Donations and issues spread over the last `days` days in date order.
+
+    Donations lean towards weekends and issues towards weekdays, so the
+    weekly pattern the shortage forecast looks for is there. Stock and each
+    center's CenterStock are moved by the net generated there, so they always
+    equal the ledger totals.
+    """
+    today = today or date.today()
+    start = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    span = days * 86_400
+    max_donor = db.fetchone("SELECT COALESCE(MAX(DonorID), 0) FROM Donors")[0]
+    net = {(center, bg): 0 for center in slots.CENTERS for bg in BLOOD_GROUPS}
+    for offset, size in _chunks(count):
+        lo, hi = span * offset // count, span * (offset + size) // count
+        seconds = np.sort(rng.integers(lo, max(hi, lo + 1), size))
+        stamps = [(start + timedelta(seconds=int(s))).strftime("%Y-%m-%d %H:%M:%S") for s in seconds]
+        weekend = np.array([(start + timedelta(seconds=int(s))).weekday() >= 5 for s in seconds])
+        donation = rng.random(size) < np.where(weekend, 0.62, 0.48)
+        groups = _weighted(rng, BLOOD_GROUP_WEIGHTS, size)
+        centers = _weighted(rng, CENTER_WEIGHTS, size)
+        units = rng.integers(1, 4, size)
+        donor_ids = rng.integers(1, max_donor + 1, size) if max_donor else np.zeros(size, dtype=int)
+        for center, bg, u, d in zip(centers, groups, units.tolist(), donation):
+            net[center, bg] += u if d else -u
+        _insert("INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date, Center) VALUES (?, ?, ?, ?, ?, ?)",
+                zip([int(i) if d else None for i, d in zip(donor_ids, donation)], groups, units.tolist(),
+                    np.where(donation, "Donation", "Issue").tolist(), stamps, centers))
+
+    with db.transaction(immediate=True) as conn:
+        # Centers that issued more of a group than they received get an opening donation on the first day.
+        opening = start.strftime("%Y-%m-%d %H:%M:%S")
+        for (center, bg), units in net.items():
+            held = conn.execute("SELECT Units FROM CenterStock WHERE Center=? AND BloodGroup=?",
+                                (center, bg)).fetchone()[0]
+            if held + units < 0:
+                top_up = -(held + units) + int(rng.integers(20, 100))
+                conn.execute("""INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date, Center)
+                                VALUES (NULL, ?, ?, 'Donation', ?, ?)""", (bg, top_up, opening, center))
+                units += top_up
+            conn.execute("UPDATE CenterStock SET Units = Units + ? WHERE Center=? AND BloodGroup=?", (units, center, bg))
+            conn.execute("UPDATE Stock SET Units = Units + ? WHERE BloodGroup=?", (units, bg))
+        trend.rebuild(conn)
+        eligibility.rebuild(conn)
+        inventory.rebuild(conn, today.isoformat())
+
+
+def bookings(rng, count, user_count, days=HISTORY_DAYS, today=None):
+    today = today or date.today()
+    first_day = (today - timedelta(days=days - 1)).toordinal()
+    for _, size in _chunks(count):
+        user_ids = rng.integers(0, max(user_count, 1), size)
+        day_numbers = rng.integers(first_day, today.toordinal() + BOOKING_HORIZON + 1, size)
+        created = datetime.now().isoformat()
+        _insert("""INSERT INTO Bookings (Username, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                zip((f"user{u}" for u in user_ids.tolist()), _names(rng, size), _contacts(rng, size),
+                    _weighted(rng, BLOOD_GROUP_WEIGHTS, size),
+                    np.array(slots.CENTERS, dtype=object)[rng.integers(0, len(slots.CENTERS), size)],
+                    (date.fromordinal(d).isoformat() for d in day_numbers.tolist()),
+                    np.array(slots.TIME_SLOTS, dtype=object)[rng.integers(0, len(slots.TIME_SLOTS), size)],
+                    [created] * size))
+    # Same backfill as the slot migration: generated bookings keep their places even past capacity.
+    with db.transaction(immediate=True) as conn:
+        conn.execute("""INSERT INTO Slots (SlotDate, Center, SlotTime, Capacity, Booked)
+                        SELECT BookingDate, Center, BookingTime, MAX(COUNT(*), ?), COUNT(*)
+                        FROM Bookings WHERE true GROUP BY BookingDate, Center, BookingTime
+                        ON CONFLICT (SlotDate, Center, SlotTime) DO UPDATE SET
+                            Booked = excluded.Booked, Capacity = MAX(Capacity, excluded.Booked)""",
+                     (slots.DEFAULT_CAPACITY,))
+
+
+# ------------------ DRIVER ------------------
+def counts_for(scale, **overrides):
+    counts = {table: int(scale * ratio) for table, ratio in RATIOS.items()}
+    counts.update({table: n for table, n in overrides.items() if n is not None})
+    return counts
+
+
+def table_counts():
+    return {table: db.fetchone(f"SELECT COUNT(*) FROM {table}")[0]
+            for table in ("Users", "Donors", "Stock", "Transactions", "Bookings", "DailyStock", "Slots")}
+
+
+def generate(path=None, scale=10_000, seed=0, days=HISTORY_DAYS, progress=None, **overrides):
+    """Populate a LifeLink database with synthetic data; returns {table: seconds taken}.
+
+    `scale` is the donor count, the other tables follow RATIOS unless given
+    explicitly (users=, donors=, transactions=, bookings=). The same seed
+    always produces the same rows.
+    """
+    if path is not None:
+        db.configure(path)
+        migrations.reset()
+    migrations.ensure_schema()
+    counts = counts_for(scale, **overrides)
+    rng = np.random.default_rng(seed)
+    first_user = db.fetchone("SELECT COUNT(*) FROM Users")[0]
+
+    timings = {}
+    steps = (
+        ("users", lambda: users(rng, counts["users"], first_user)),
+        ("donors", lambda: donors(rng, counts["donors"])),
+        ("transactions", lambda: transactions(rng, counts["transactions"], days)),
+        ("bookings", lambda: bookings(rng, counts["bookings"], first_user + counts["users"], days)),
+    )
+    for name, step in steps:
+        if progress:
+            progress(name, counts[name])
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    kpi.rebuild()
+    db.execute("ANALYZE")
+    cache.bump("Users", "Donors", "Stock", "CenterStock", "Transactions", "DailyStock", "Lots", "Bookings", "Slots",
+               "KpiSnapshot")
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a LifeLink database with synthetic data.")
+    parser.add_argument("db", help="database file to create or extend")
+    parser.add_argument("--scale", type=int, default=10_000, help="number of donors (default 10000)")
+    for table in RATIOS:
+        parser.add_argument(f"--{table}", type=int, help=f"override the {table} row count")
+    parser.add_argument("--days", type=int, default=HISTORY_DAYS, help="days of transaction history")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    overrides = {table: getattr(args, table) for table in RATIOS}
+    timings = generate(args.db, args.scale, args.seed, args.days,
+                       progress=lambda name, n: print(f"{name}: {n:,} rows...", file=sys.stderr), **overrides)
+    for name, seconds in timings.items():
+        print(f"{name:<14}{seconds:8.1f} s")
+    for table, n in table_counts().items():
+        print(f"{table:<14}{n:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# lifelink/trend.py
+import sys
+from datetime import date
+
+from lifelink import cache, db, queryplan
+
+RANGES = {"30 days": 30, "90 days": 90, "1 year": 365, "All": None}
+MAX_POINTS = 300  # per blood group, whatever the selected range
+
+UPSERT_SQL = """INSERT INTO DailyStock (Day, BloodGroup, Donated, Issued, Closing)
+                VALUES (?, ?, ?, ?, (SELECT Units FROM Stock WHERE BloodGroup=?))
+                ON CONFLICT (Day, BloodGroup) DO UPDATE SET
+                    Donated = Donated + excluded.Donated,
+                    Issued = Issued + excluded.Issued,
+                    Closing = excluded.Closing"""
+
+REBUILD_SQL = """INSERT INTO DailyStock (Day, BloodGroup, Donated, Issued, Closing)
+                 SELECT f.Day, f.BloodGroup, f.Donated, f.Issued,
+                        COALESCE(s.Units, 0) - COALESCE(SUM(f.Donated - f.Issued) OVER (
+                            PARTITION BY f.BloodGroup ORDER BY f.Day DESC
+                            ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+                 FROM (SELECT substr(Date, 1, 10) AS Day, BloodGroup,
+                              SUM(CASE WHEN Type='Donation' THEN Units ELSE 0 END) AS Donated,
+                              SUM(CASE WHEN Type<>'Donation' THEN Units ELSE 0 END) AS Issued
+                       FROM Transactions GROUP BY Day, BloodGroup) f
+                 LEFT JOIN Stock s ON s.BloodGroup = f.BloodGroup"""
+
+RANGE_SQL = queryplan.register(
+    "daily_stock_range",
+    "SELECT Day, BloodGroup, Donated, Issued, Closing FROM DailyStock WHERE Day >= ? ORDER BY Day",
+    ("2024-01-01",))
+OPENING_SQL = queryplan.register(
+    "daily_stock_opening",
+    """SELECT s.BloodGroup,
+              (SELECT d.Closing FROM DailyStock d WHERE d.BloodGroup = s.BloodGroup AND d.Day < ?
+               ORDER BY d.Day DESC LIMIT 1)
+       FROM Stock s ORDER BY s.BloodGroup""",
+    ("2024-01-01",), allow_scan=True)
+
+
+# ------------------ MAINTENANCE ------------------
+def record(conn, blood_group, t_type, units, day):
+    """Fold one stock movement into DailyStock; call inside the movement's transaction, after Stock is updated."""
+    donated, issued = (units, 0) if t_type == "Donation" else (0, units)
+    conn.execute(UPSERT_SQL, (day, blood_group, donated, issued, blood_group))
+
+
+def rebuild(conn=None):
+    """Recompute DailyStock from Transactions, anchoring closing levels on the current Stock."""
+    if conn is None:
+        with db.transaction(immediate=True) as conn:
+            rows = rebuild(conn)
+            cache.record(conn, "DailyStock")
+        return rows
+    conn.execute("DELETE FROM DailyStock")
+    return conn.execute(REBUILD_SQL).rowcount
+
+
+# ------------------ SERIES ------------------
+@cache.cached("DailyStock")
+def stock_series(days=None, today=None):
+    """Daily closing stock per group, forward-filled over days without movements.
+
+    Returns (day array, blood groups, levels) where levels[t, g] is the stock
+    of groups[g] at the end of day[t]; the series ends today and covers the
+    last `days` days (all recorded history when None).
+    """
+    import numpy as np
+
+    today = np.datetime64(today or date.today(), "D")
+    start = today - (days - 1) if days else None
+    rows = db.fetchall(RANGE_SQL, (str(start) if start is not None else "",))
+    if start is None:
+        start = np.datetime64(rows[0][0], "D") if rows else today
+    opening_rows = db.fetchall(OPENING_SQL, (str(start),))
+    groups = [bg for bg, _ in opening_rows]
+    column = {bg: g for g, bg in enumerate(groups)}
+
+    n = max((today - start).astype(int) + 1, 1)
+    levels = np.full((n, len(groups)), np.nan)
+    opening = np.array([np.nan if o is None else o for _, o in opening_rows], dtype=float)
+    for day, bg, donated, issued, closing in rows:
+        t, g = (np.datetime64(day, "D") - start).astype(int), column.get(bg)
+        if g is None or t >= n:
+            continue
+        levels[t, g] = closing
+        if np.isnan(opening[g]):
+            # No history before the range: the group started the range at this day's opening level.
+            opening[g] = closing - donated + issued
+    opening = np.nan_to_num(opening)
+
+    # Forward-fill each column from the last day that had a movement.
+    has_value = ~np.isnan(levels)
+    last = np.where(has_value, np.arange(n)[:, None], -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    filled = np.where(last >= 0, levels[np.maximum(last, 0), np.arange(len(groups))], opening)
+    return start + np.arange(n), groups, filled
+
+
+def downsample(days, levels, max_points=MAX_POINTS):
+    """Keep at most max_points evenly spaced rows, always including the latest day.
+
+    A stock level is a state, so each bucket is represented by its closing value.
+    """
+    import numpy as np
+
+    n = len(days)
+    if n <= max_points:
+        return days, levels
+    step = -(-n // max_points)
+    idx = np.arange(n - 1, -1, -step)[::-1]
+    return days[idx], levels[idx]
+
+
+if __name__ == "__main__":
+    # python -m lifelink.trend rebuild [path/to/lifelink.db]
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        sys.exit("usage: python -m lifelink.trend rebuild [db]")
+    from lifelink import migrations, trend
+
+    if len(sys.argv) > 2:
+        db.configure(sys.argv[2])
+    migrations.ensure_schema()
+    print(f"DailyStock rebuilt: {trend.rebuild()} rows")
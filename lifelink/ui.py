@@ -0,0 +1,82 @@
+# lifelink/ui.py
+import streamlit as st
+
+from lifelink import perf, repository as repo
+
+PAGE_SIZES = [25, 50, 100, 250]
+DONOR_HEADERS = ["ID", "Name", "Age", "Gender", "Blood Group", "Contact"]
+
+
+def _pages(key, view):
+    # The cursor stack lives in session_state under `key`, so Previous/Next survive
+    # reruns; it starts over whenever the view (filter, sort, page size) changes.
+    state = st.session_state.setdefault(key, {"view": view, "cursors": [None]})
+    if state["view"] != view:
+        state.update(view=view, cursors=[None])
+    return state
+
+
+def _page_buttons(key, state, next_cursor):
+    """Previous/Next buttons; returns the middle column for the page caption."""
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Previous", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+        state["cursors"].pop()
+        st.rerun()
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+        state["cursors"].append(next_cursor)
+        st.rerun()
+    return info_col
+
+
+def paginated_table(key, fetch, render, columns, view=(), empty="No rows found."):
+    """Show any keyset-paginated result one page at a time.
+
+    fetch(after, limit) returns (rows, next cursor or None) like repo.donor_page;
+    `view` holds whatever the rows depend on, so changing it goes back to page 1.
+    """
+    import pandas as pd
+
+    limit = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    state = _pages(key, (view, limit))
+    rows, next_cursor = fetch(state["cursors"][-1], limit)
+    if not rows:
+        st.info(empty)
+        return
+    with perf.span("dataframe"):
+        df = pd.DataFrame(rows, columns=columns)
+    render(df)
+    _page_buttons(key, state, next_cursor).write(f"Page {len(state['cursors'])}")
+
+
+def paginated_donor_table(key, render, blood_group=None):
+    """Show donors one keyset page at a time; only the visible page is fetched and rendered.
+
+    `render` draws a DataFrame (each app passes its own render_centered_table).
+    Previous/Next survive reruns and reset whenever the filter, sort or page
+    size changes.
+    """
+    import pandas as pd
+
+    c1, c2, c3 = st.columns(3)
+    sort = c1.selectbox("Sort by", list(repo.DONOR_SORTS), key=f"{key}_sort")
+    descending = c2.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Descending"
+    limit = c3.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    state = _pages(key, (blood_group, sort, descending, limit))
+    rows, next_cursor = repo.donor_page(blood_group, state["cursors"][-1], limit, sort, descending)
+    if not rows:
+        st.info("No donors found." if blood_group is None else "No donors found for this blood group.")
+        return
+
+    columns = DONOR_HEADERS if blood_group is None else [h for h in DONOR_HEADERS if h != "Blood Group"]
+    with perf.span("dataframe"):
+        df = pd.DataFrame(rows, columns=DONOR_HEADERS)[columns]
+    render(df)
+
+    info_col = _page_buttons(key, state, next_cursor)
+    page = len(state["cursors"])
+    # COUNT(*) is only run when asked for, then cached until Donors changes.
+    if info_col.checkbox("Show total", key=f"{key}_total"):
+        info_col.write(f"Page {page} · {repo.count_donors(blood_group):,} donors")
+    else:
+        info_col.write(f"Page {page}")
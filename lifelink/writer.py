@@ -0,0 +1,164 @@
+# lifelink/writer.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from lifelink import cache, db, perf
+
+# Mutations committed together at most; under light load a batch is just whatever is queued.
+MAX_BATCH = int(os.environ.get("LIFELINK_WRITE_BATCH", 64))
+
+
+class Writer:
+    """One thread owns every interactive write and group-commits what has queued up.
+
+    Each mutation is fn(conn) and runs inside its own SAVEPOINT of a shared
+    BEGIN IMMEDIATE transaction, so a failing mutation (say InsufficientStock)
+    is rolled back alone while the rest of the batch still commits. The tables
+    each successful mutation touched are bumped in the read cache as part of
+    the same transaction, and futures are resolved only after COMMIT.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._conn = None          # the open batch transaction, for writes issued from inside a mutation
+        self._start_lock = threading.Lock()
+        self._stats = {"writes": 0, "failed": 0, "batches": 0, "largest_batch": 0, "queue_wait": 0.0,
+                       "retries": 0}
+
+    def submit(self, fn, *tables):
+        """Queue fn(conn) for the writer thread; returns a Future with its result or exception.
+
+        Cancelling the future before the writer picks it up skips the mutation.
+        """
+        if threading.current_thread() is self._thread:
+            # Already inside a batch (e.g. a mutation that records a movement): run in the same transaction.
+            future = Future()
+            future.set_result(fn(self._conn))
+            cache.record(self._conn, *tables)
+            return future
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, tables, future, time.perf_counter()))
+        return future
+
+    def write(self, fn, *tables):
+        """submit() and wait: the blocking form every repository write uses."""
+        return wait(self.submit(fn, *tables), fn.__qualname__.replace(".<locals>", ""))
+
+    def stats(self):
+        s = dict(self._stats, queued=self._queue.qsize())
+        s["avg_batch"] = s["writes"] / s["batches"] if s["batches"] else 0.0
+        return s
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="lifelink-writer", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # A future cancelled while queued is dropped unrun; the rest can no longer be cancelled.
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._commit(batch)
+            except Exception as exc:
+                # Fail this batch rather than the thread: every later write would wait on it forever.
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        attempts = [0]
+
+        def run():
+            attempts[0] += 1
+            outcomes = []
+            with db.transaction(immediate=True) as conn:
+                self._conn = conn
+                try:
+                    for fn, _, _, _ in batch:
+                        conn.execute("SAVEPOINT mutation")
+                        try:
+                            outcomes.append((True, fn(conn)))
+                        except Exception as exc:
+                            conn.execute("ROLLBACK TO mutation")
+                            outcomes.append((False, exc))
+                        finally:
+                            conn.execute("RELEASE mutation")
+                    touched = {t for (ok, _), (_, ts, _, _) in zip(outcomes, batch) if ok for t in ts}
+                    if touched:
+                        cache.record(conn, *touched)
+                finally:
+                    self._conn = None
+            return outcomes
+
+        try:
+            # A busy database rolls the whole batch back, so running it again is safe.
+            outcomes = db.retry_busy(run)
+        except Exception as exc:
+            outcomes = [(False, exc)] * len(batch)
+
+        s = self._stats
+        s["batches"] += 1
+        s["writes"] += len(batch)
+        s["failed"] += sum(1 for ok, _ in outcomes if not ok)
+        s["largest_batch"] = max(s["largest_batch"], len(batch))
+        s["queue_wait"] += sum(started - queued for _, _, _, queued in batch)
+        s["retries"] += attempts[0] - 1
+        for (ok, value), (_, _, future, _) in zip(outcomes, batch):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = Writer()
+    return _writer
+
+
+def wait(future, name):
+    """future.result(); the SQL runs on the writer thread, so the wait is charged to the caller's rerun."""
+    if not perf.ENABLED:
+        return future.result()
+    started = time.perf_counter()
+    try:
+        return future.result()
+    finally:
+        perf.charge(f"WRITE {name}", started, time.perf_counter() - started)
+
+
+def submit(fn, *tables):
+    return get_writer().submit(fn, *tables)
+
+
+def write(fn, *tables):
+    return get_writer().write(fn, *tables)
+
+
+def stats():
+    return get_writer().stats()
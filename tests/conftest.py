@@ -0,0 +1,44 @@
+# tests/conftest.py
+import sqlite3
+
+import pytest
+
+from lifelink import db, migrations
+
+# The schema admin.py/user.py created before migrations existed, with a little data.
+LEGACY_SCHEMA = """
+CREATE TABLE Users (UserID INTEGER PRIMARY KEY AUTOINCREMENT, Username TEXT UNIQUE, Password TEXT,
+                    FullName TEXT, Age INTEGER, Gender TEXT, Contact TEXT, Role TEXT DEFAULT 'User');
+CREATE TABLE Donors (DonorID INTEGER PRIMARY KEY AUTOINCREMENT, Name TEXT, Age INTEGER, Gender TEXT,
+                     BloodGroup TEXT, Contact TEXT);
+CREATE TABLE Stock (BloodGroup TEXT PRIMARY KEY, Units INTEGER DEFAULT 0);
+CREATE TABLE Transactions (TransactionID INTEGER PRIMARY KEY AUTOINCREMENT, DonorID INTEGER, BloodGroup TEXT,
+                           Units INTEGER, Type TEXT, Date TEXT);
+INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact) VALUES ('Ann Lee', 30, 'Female', 'A+', '5550101');
+INSERT INTO Stock (BloodGroup, Units) VALUES ('A+', 3);
+INSERT INTO Transactions (DonorID, BloodGroup, Units, Type, Date) VALUES (1, 'A+', 3, 'Donation', '2026-09-01 10:00:00');
+"""
+
+
+def open_db(path):
+    db.configure(path)
+    migrations.reset()
+    migrations.ensure_schema()
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A legacy database, not yet migrated; returns its path."""
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    yield path
+    db.configure(tmp_path / "closed.db")
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    open_db(tmp_path / "lifelink.db")
+    yield tmp_path / "lifelink.db"
+    db.configure(tmp_path / "closed.db")
@@ -0,0 +1,38 @@
+# tests/test_invariants.py
+from datetime import date, timedelta
+
+import pytest
+
+from lifelink import db, ledger, loadtest, queryplan, repository as repo, slots
+from conftest import open_db
+
+HOME = slots.HOME_CENTER
+AWAY = next(center for center in slots.CENTERS if center != HOME)
+
+
+def test_stock_lots_centers_and_kpis_agree_after_every_kind_of_movement(legacy_db):
+    open_db(legacy_db)
+    donor_id = repo.add_donor("Ravi Kumar", 35, "Male", "O+", "9876543210")
+
+    repo.update_stock("O+", 10, "Donation", donor_id)
+    repo.update_stock("O+", 4, "Issue")
+    repo.transfer_stock("O+", 3, HOME, AWAY)
+    repo.update_stock("O+", 2, "Issue", center=AWAY)
+    with pytest.raises(ledger.InsufficientStock):
+        repo.update_stock("O+", 5, "Issue", center=AWAY)
+
+    # Expiry: the legacy A+ donation is past its shelf life, and an O- lot is made to be.
+    assert ledger.expire_due() == {(HOME, "A+"): 3}
+    repo.update_stock("O-", 6, "Donation")
+    db.execute("UPDATE Lots SET Expiry = '2000-01-01' WHERE BloodGroup = 'O-'")
+    with pytest.raises(ledger.InsufficientStock):
+        repo.transfer_stock("O-", 1, HOME, AWAY)
+
+    day = (date.today() + timedelta(days=1)).isoformat()
+    booking_id = repo.create_booking("ravi", "Ravi Kumar", "9876543210", "O+", HOME, day, "10:00")
+    repo.create_booking("ravi", "Ravi Kumar", "9876543210", "O+", HOME, day, "11:00")
+    assert repo.cancel_booking(booking_id, "ravi") == 1
+
+    assert dict(repo.view_stock.uncached())["O-"] == 0
+    assert loadtest.check_invariants(legacy_db) == []
+    queryplan.assert_no_scans()
@@ -0,0 +1,20 @@
+# tests/test_ledger.py
+import pytest
+
+from lifelink import db, kpi, ledger, slots
+from conftest import open_db
+
+
+def test_failed_issue_still_writes_off_expired_units(legacy_db):
+    # The legacy donation of 3 A+ units on 2026-09-01 is past its shelf life.
+    open_db(legacy_db)
+    today = db.fetchone("SELECT date('now', 'localtime')")[0]
+    assert db.fetchone("SELECT Expiry < ? FROM Lots WHERE BloodGroup = 'A+'", (today,))[0]
+
+    with pytest.raises(ledger.InsufficientStock):
+        ledger.record("A+", 1, "Issue")
+
+    assert db.fetchone("SELECT Units FROM Stock WHERE BloodGroup = 'A+'")[0] == 0
+    assert db.fetchone("SELECT Units FROM CenterStock WHERE Center = ? AND BloodGroup = 'A+'",
+                       (slots.HOME_CENTER,))[0] == 0
+    assert kpi.snapshot(today)["movements"]["Expired"]["today"] == 3
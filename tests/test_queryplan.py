@@ -0,0 +1,50 @@
+# tests/test_queryplan.py
+import sqlite3
+
+from lifelink import compatibility, db, eligibility, queryplan, repository, search  # noqa: F401  (register the hot queries)
+from conftest import open_db
+
+GROW = 20_000
+
+
+def _grow_donors(count):
+    groups = repository.BLOOD_GROUPS
+    with db.transaction(immediate=True) as conn:
+        conn.executemany("INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact) VALUES (?, 30, 'Male', ?, ?)",
+                         ((f"Name {i % 997}", groups[i % len(groups)], str(7_000_000_000 + i)) for i in range(count)))
+
+
+def test_fresh_database_uses_indexes(fresh_db):
+    queryplan.assert_no_scans()
+
+
+def test_legacy_database_keeps_indexes_as_it_grows(legacy_db):
+    # Statistics gathered while the database was tiny, as the old "secondary indexes" migration left them.
+    conn = sqlite3.connect(legacy_db)
+    conn.execute("CREATE INDEX idx_donors_bloodgroup ON Donors (BloodGroup, Name, Age, Gender, Contact)")
+    conn.execute("ANALYZE")
+    conn.close()
+    open_db(legacy_db)
+    _grow_donors(GROW)
+    repository.donor_page.uncached("A+", None, 50)
+    open_db(legacy_db)   # the pool's connections are optimized as they close
+
+    queryplan.assert_no_scans()
+
+
+def _stale_statistics(legacy_db):
+    """Connection to a legacy database analyzed while tiny, then grown; nothing refreshes the statistics."""
+    conn = sqlite3.connect(legacy_db, isolation_level=None)
+    conn.execute("CREATE INDEX idx_donors_bloodgroup ON Donors (BloodGroup, Name, Age, Gender, Contact)")
+    conn.execute("ANALYZE")
+    open_db(legacy_db)
+    _grow_donors(GROW)
+    db.get_pool()._idle.clear()   # drop the pool's connections without optimizing them
+    conn.execute("DELETE FROM sqlite_stat1 WHERE idx != 'idx_donors_bloodgroup'")
+    return sqlite3.connect(legacy_db, isolation_level=None)
+
+
+def test_keyset_pages_seek_whatever_the_statistics(legacy_db):
+    conn = _stale_statistics(legacy_db)
+    failures = queryplan.audit(conn)
+    assert not [name for name in failures if name.startswith(("donor_page", "compatible_donors"))], failures
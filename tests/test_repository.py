@@ -0,0 +1,10 @@
+# tests/test_repository.py
+from lifelink import kpi, repository as repo
+
+
+def test_delete_donor_reports_what_it_deleted(fresh_db):
+    donor_id = repo.add_donor("Zed Quinn", 40, "Male", "B-", "5551234")
+    assert repo.delete_donor(donor_id) == "B-"
+    assert repo.delete_donor(donor_id) is None
+    assert repo.get_donor(donor_id) is None
+    assert "B-" not in kpi.snapshot("2026-01-01")["donors"]
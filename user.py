@@ -1,23 +1,11 @@
 # lifelink_user_app.py
 import streamlit as st
-import sqlite3
-from datetime import datetime, date
-import hashlib
-from PIL import Image
-import pandas as pd
-from pathlib import Path
-import altair as alt
-import base64
+from datetime import date, timedelta
+from lifelink import assets, kpi, migrations, perf, repository as repo, slots, trend
 
 # ------------------ CONFIG ------------------
 st.set_page_config(page_title="LifeLink Blood Bank - User", layout="wide")
 
-# Updated LOGO PATH
-LOGO_PATH = Path(r"C:\Users\ashis\OneDrive\Desktop\sanika\Lifelink\logo.jpeg")
-
-BASE_DIR = Path(__file__).parent if "__file__" in globals() else Path.cwd()
-DB_PATH = BASE_DIR / "lifelink.db"
-
 # ------------------ SESSION DEFAULTS ------------------
 for key, default in {
     "logged_in": False,
@@ -30,71 +18,7 @@ for key, default in {
         st.session_state[key] = default
 
 # ------------------ DATABASE HELPERS ------------------
-def connect_db():
-    return sqlite3.connect(str(DB_PATH), check_same_thread=False)
-
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def init_db():
-    db = connect_db()
-    cur = db.cursor()
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS Users (
-                    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    Username TEXT UNIQUE,
-                    Password TEXT,
-                    FullName TEXT,
-                    Age INTEGER,
-                    Gender TEXT,
-                    Contact TEXT,
-                    Role TEXT DEFAULT 'User'
-                 )''')
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS Donors (
-                    DonorID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    Name TEXT,
-                    Age INTEGER,
-                    Gender TEXT,
-                    BloodGroup TEXT,
-                    Contact TEXT
-                 )''')
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS Stock (
-                    BloodGroup TEXT PRIMARY KEY,
-                    Units INTEGER DEFAULT 0
-                 )''')
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS Transactions (
-                    TransactionID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    DonorID INTEGER,
-                    BloodGroup TEXT,
-                    Units INTEGER,
-                    Type TEXT,
-                    Date TEXT
-                 )''')
-
-    cur.execute('''CREATE TABLE IF NOT EXISTS Bookings (
-                    BookingID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    Username TEXT,
-                    FullName TEXT,
-                    Contact TEXT,
-                    BloodGroup TEXT,
-                    Center TEXT,
-                    BookingDate TEXT,
-                    BookingTime TEXT,
-                    CreatedAt TEXT
-                 )''')
-
-    cur.execute("SELECT COUNT(*) FROM Stock")
-    if cur.fetchone()[0] == 0:
-        for bg in ['A+','A-','B+','B-','O+','O-','AB+','AB-']:
-            cur.execute("INSERT INTO Stock (BloodGroup, Units) VALUES (?, ?)", (bg, 0))
-
-    db.commit()
-    db.close()
-
-init_db()
+migrations.ensure_schema()
 
 # ------------------ USER / AUTH ------------------
 def signup(username, password, full_name, age, gender, contact):
@@ -102,120 +26,59 @@ def signup(username, password, full_name, age, gender, contact):
         st.error("⚠️ Please fill in all required fields.")
         return False
 
-    db = connect_db()
-    cur = db.cursor()
-    try:
-        cur.execute("""INSERT INTO Users (Username, Password, FullName, Age, Gender, Contact, Role)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (username.strip(), hash_password(password), full_name.strip(), age, gender, contact.strip(), "User"))
-        db.commit()
+    if repo.create_user(username.strip(), password, full_name.strip(), age, gender, contact.strip()):
         st.success("✅ Signup successful! You can now log in.")
         return True
-    except sqlite3.IntegrityError:
-        st.error("❌ Username already exists.")
-        return False
-    finally:
-        db.close()
-
-def login(username, password):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("SELECT Username, Role FROM Users WHERE Username=? AND Password=?", (username, hash_password(password)))
-    user = cur.fetchone()
-    db.close()
-    return user
-
-def get_user_profile(username):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("SELECT FullName, Age, Gender, Contact FROM Users WHERE Username=?", (username,))
-    profile = cur.fetchone()
-    db.close()
-    return profile
+    st.error("❌ Username already exists.")
+    return False
+
+login = repo.login
+get_user_profile = repo.get_user_profile
 
 def update_profile(username, full_name, age, gender, contact):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("""UPDATE Users SET FullName=?, Age=?, Gender=?, Contact=? WHERE Username=?""",
-                (full_name, age, gender, contact, username))
-    db.commit()
-    db.close()
+    repo.update_profile(username, full_name, age, gender, contact)
     st.success("✅ Profile updated.")
 
 # ------------------ BOOKINGS ------------------
 def create_booking(username, full_name, contact, blood_group, center, booking_date, booking_time):
-    db = connect_db()
-    cur = db.cursor()
-    created_at = datetime.now().isoformat()
-    cur.execute("""INSERT INTO Bookings
-                   (Username, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (username, full_name, contact, blood_group, center, booking_date, booking_time, created_at))
-    db.commit()
-    db.close()
+    try:
+        repo.create_booking(username, full_name, contact, blood_group, center, booking_date, booking_time)
+    except repo.SlotFull:
+        st.error(f"❌ {center} is fully booked at {booking_time} on {booking_date}. Please pick another slot.")
+        return
     st.success(f"✅ Booking saved for {booking_date} at {booking_time} — {center}")
 
-def get_user_bookings(username):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("""SELECT BookingID, FullName, Contact, BloodGroup, Center, BookingDate, BookingTime, CreatedAt
-                   FROM Bookings WHERE Username=? ORDER BY BookingDate, BookingTime""", (username,))
-    rows = cur.fetchall()
-    db.close()
-    return rows
+get_user_bookings = repo.get_user_bookings
 
 def cancel_booking(booking_id, username):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("DELETE FROM Bookings WHERE BookingID=? AND Username=?", (booking_id, username))
-    db.commit()
-    db.close()
+    repo.cancel_booking(booking_id, username)
     st.success("🗑️ Booking cancelled.")
 
 # ------------------ DONORS & STOCK ------------------
-def view_all_donors():
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("SELECT DonorID, Name, Age, Gender, BloodGroup, Contact FROM Donors")
-    rows = cur.fetchall()
-    db.close()
-    return rows
-
 def add_donor(name, age, gender, blood_group, contact):
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("""INSERT INTO Donors (Name, Age, Gender, BloodGroup, Contact)
-                   VALUES (?, ?, ?, ?, ?)""", (name, age, gender, blood_group, contact))
-    db.commit()
-    db.close()
+    repo.add_donor(name, age, gender, blood_group, contact)
     st.success("✅ Donor added.")
 
-def view_stock():
-    db = connect_db()
-    cur = db.cursor()
-    cur.execute("SELECT BloodGroup, Units FROM Stock ORDER BY BloodGroup")
-    rows = cur.fetchall()
-    db.close()
-    return rows
+view_stock = repo.view_stock
 
 # ------------------ UI HELPERS ------------------
 def display_main_logo():
     try:
-        st.image(str(LOGO_PATH), width=300)
+        st.image(assets.logo(assets.MAIN_LOGO_WIDTH).data, width=assets.MAIN_LOGO_WIDTH)
     except:
         st.error("⚠️ Logo not found.")
 
 def display_small_logo():
     try:
-        b64 = base64.b64encode(open(LOGO_PATH, "rb").read()).decode()
         st.markdown(
-            f"<img src='data:image/jpeg;base64,{b64}' style='position:fixed; top:80px; right:10px; width:56px; z-index:100;'>",
+            assets.logo_tag(assets.SMALL_LOGO_WIDTH, "position:fixed; top:80px; right:10px; z-index:100;"),
             unsafe_allow_html=True
         )
     except:
         pass
 
-def render_centered_table(df: pd.DataFrame):
+@perf.timed("to_html")
+def render_centered_table(df: "pd.DataFrame"):
     st.markdown(
         df.to_html(index=False, classes="table table-striped table-bordered"),
         unsafe_allow_html=True
@@ -268,10 +131,12 @@ def main():
     sidebar_menu()
 
     if st.session_state.show_profile:
+        perf.page("Profile")
         show_profile()
         return
 
     action = st.session_state.selected_action or "Home"
+    perf.page(action)
 
     if action == "Home":
         st.header("Welcome to LifeLink")
@@ -339,16 +204,23 @@ def main():
         pre_fullname = profile[0]
         pre_contact = profile[3]
 
+        # Center and date sit outside the form so the time slots below follow them.
+        center = st.selectbox("Donation Center", slots.CENTERS)
+        booking_date = st.date_input("Booking Date", min_value=date.today())
+        month_start = booking_date.replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        free = slots.availability(month_start.isoformat(), month_end.isoformat())
+        open_times = dict(slots.open_slots(center, booking_date.isoformat(), free))
+
         with st.form("booking_form"):
             full_name = st.text_input("Full Name", value=pre_fullname)
             contact = st.text_input("Contact", value=pre_contact)
-            blood_group = st.selectbox("Blood Group", ['A+','A-','B+','B-','O+','O-','AB+','AB-'])
-            center = st.selectbox("Donation Center",
-                                  ["City Hall", "Community Center", "Central Hospital", "Mobile Unit"])
-            booking_date = st.date_input("Booking Date", min_value=date.today())
-            booking_time = st.selectbox("Time Slot",
-                                        ["09:00 AM","10:00 AM","11:00 AM","12:00 PM","01:00 PM","02:00 PM","03:00 PM"])
-            submitted = st.form_submit_button("Book Slot")
+            blood_group = st.selectbox("Blood Group", repo.BLOOD_GROUPS)
+            booking_time = st.selectbox("Time Slot", list(open_times),
+                                        format_func=lambda t: f"{t} ({open_times[t]} left)")
+            submitted = st.form_submit_button("Book Slot", disabled=not open_times)
+        if not open_times:
+            st.warning(f"No open slots at {center} on {booking_date}.")
 
         if submitted:
             if not all([full_name.strip(), contact.strip()]):
@@ -361,6 +233,7 @@ def main():
         st.markdown("### My Upcoming Bookings")
         bookings = get_user_bookings(st.session_state.username)
         if bookings:
+            import pandas as pd
             df = pd.DataFrame(bookings, columns=["BookingID","FullName","Contact","BloodGroup","Center","BookingDate","BookingTime","CreatedAt"])
             df["BookingDate"] = pd.to_datetime(df["BookingDate"]).dt.date
             render_centered_table(df[["BookingID","FullName","Contact","BloodGroup","Center","BookingDate","BookingTime"]])
@@ -378,15 +251,26 @@ def main():
 
     elif action == "Blood Stock Trend":
         st.header("Blood Stock Trend")
-        stock = view_stock()
-        df_stock = pd.DataFrame(stock, columns=["BloodGroup","Units"])
-        df_stock["Units"] = pd.to_numeric(df_stock["Units"])
-        chart = alt.Chart(df_stock).mark_bar().encode(
-            x=alt.X("BloodGroup:N", sort=None),
+        import pandas as pd
+        import altair as alt
+        c1, c2 = st.columns([1, 3])
+        range_label = c1.selectbox("Range", list(trend.RANGES), index=1)
+        days, groups, levels = trend.stock_series(trend.RANGES[range_label], date.today().isoformat())
+        selected = c2.multiselect("Blood Groups", groups, default=groups)
+        days, levels = trend.downsample(days, levels)
+
+        with perf.span("dataframe"):
+            df_trend = pd.DataFrame(levels, columns=groups)[selected]
+            df_trend.insert(0, "Date", pd.to_datetime(days))
+            df_trend = df_trend.melt("Date", var_name="BloodGroup", value_name="Units")
+        chart = alt.Chart(df_trend).mark_line(interpolate="step-after").encode(
+            x=alt.X("Date:T"),
             y=alt.Y("Units:Q"),
-            tooltip=["BloodGroup","Units"]
+            color=alt.Color("BloodGroup:N"),
+            tooltip=["Date:T","BloodGroup","Units"]
         )
-        st.altair_chart(chart, use_container_width=True)
+        with perf.span("altair"):
+            st.altair_chart(chart, use_container_width=True)
 
     elif action == "My Blood Type Status":
         st.header("My Blood Type Status")
@@ -396,7 +280,7 @@ def main():
             units = stock.get(user_blood_type, None)
             if units is None:
                 st.error("❌ Unknown blood group.")
-            elif units < 5:
+            elif units < kpi.LOW_STOCK:
                 st.warning(f"⚠️ Low stock: {units} units")
             else:
                 st.success(f"Available units: {units}")
@@ -404,7 +288,7 @@ def main():
     elif action == "Who's Needed Now?":
         st.header("Urgent Blood Needs")
         stock = dict(view_stock())
-        low = {bg:u for bg,u in stock.items() if u < 5}
+        low = {bg:u for bg,u in stock.items() if u < kpi.LOW_STOCK}
         if low:
             st.warning("Low stock groups:")
             for bg,u in low.items():
@@ -419,6 +303,7 @@ def main():
 def unauth_menu():
     st.sidebar.title("LifeLink")
     choice = st.sidebar.selectbox("Menu", ["Home", "Signup", "Login"])
+    perf.page(choice)
 
     if choice == "Home":
         # Display logo without center alignment
@@ -431,7 +316,7 @@ def unauth_menu():
             pw = st.text_input("Password", type='password')
             full_name = st.text_input("Full Name")
             age = st.number_input("Age", 0, 120, value=18)
-            gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+            gender = st.selectbox("Gender", repo.GENDERS)
             contact = st.text_input("Contact")
             submitted = st.form_submit_button("Signup")
         if submitted:
@@ -465,8 +350,8 @@ def show_profile():
     with st.form("profile_form"):
         fn = st.text_input("Full Name", value=full_name)
         ag = st.number_input("Age", min_value=0, max_value=120, value=age or 18)
-        gen = st.selectbox("Gender", ["Male","Female","Other"],
-                           index=["Male","Female","Other"].index(gender))
+        gen = st.selectbox("Gender", repo.GENDERS,
+                           index=repo.GENDERS.index(gender))
         cont = st.text_input("Contact", value=contact)
         save = st.form_submit_button("Save Changes")
     if save:
@@ -479,4 +364,8 @@ def show_profile():
 
 # ------------------ START ------------------
 if __name__ == "__main__":
+    # As in admin.py: a rerun cut short by st.rerun()/st.stop() never reaches end(),
+    # and the next begin() records it as interrupted.
+    perf.begin("user")
     main()
+    perf.end()